@@ -5,9 +5,18 @@ from flask_migrate import Migrate
 from flask_wtf import CSRFProtect
 
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
+from .formats import NegotiatingJSONProvider
 app = Flask(__name__)
 
 app.config.from_object(Config)
+if app.config["PROXY_FIX_HOPS"]:
+    app.wsgi_app = ProxyFix(
+        app.wsgi_app,
+        x_for=app.config["PROXY_FIX_HOPS"],
+        x_proto=app.config["PROXY_FIX_HOPS"],
+    )
+app.json = NegotiatingJSONProvider(app)
 
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
@@ -17,11 +26,21 @@ csrf = CSRFProtect(app)
 flask_env = app.config["FLASK_ENV"]
 
 if flask_env == "development":
-    CORS(app, origins=["http://localhost:5173"], supports_credentials=True)
+    CORS(
+        app,
+        origins=["http://localhost:5173"],
+        supports_credentials=True,
+        expose_headers=["X-Next-Cursor"],
+    )
 else:
-    CORS(app, origins=["https://jam-date.onrender.com"], supports_credentials=True)
+    CORS(
+        app,
+        origins=["https://jam-date.onrender.com"],
+        supports_credentials=True,
+        expose_headers=["X-Next-Cursor"],
+    )
 import os
 
 os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
 
-from app import views, models
+from app import views, models, commands
@@ -0,0 +1,117 @@
+"""
+Serving the built Vue app.
+
+Vite writes content-hashed file names under ``assets/``, so a given URL
+never changes and those files can be cached by browsers for a year
+without revalidation. ``index.html`` is the only entry point that does
+change between deploys; it stays short-lived, is read from disk once per
+worker (on every request in debug mode), and is sent with ``Link``
+preload headers for the entry chunks listed in the Vite manifest so the
+browser can fetch them while it is still parsing the page.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+from flask import make_response, request
+from werkzeug.exceptions import NotFound
+
+from app import app
+
+MANIFEST_PATH = os.path.join(".vite", "manifest.json")
+
+
+def immutable(response):
+    """
+    Mark a fingerprinted asset response as cacheable forever. 304s are
+    marked too, since a revalidation replaces the cached headers.
+    """
+    if not app.config["STATIC_IMMUTABLE_ASSETS"]:
+        return response
+    if response.status_code not in (200, 304):
+        return response
+    max_age = app.config["STATIC_ASSETS_MAX_AGE"]
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.cache_control.immutable = True
+    return response
+
+
+def _preload_links(manifest):
+    """``Link`` header values for the entry chunks of a Vite manifest."""
+    links = []
+    seen = set()
+    visited = set()
+
+    def add(url, rel, as_=None):
+        if url in seen:
+            return
+        seen.add(url)
+        link = f"</{url}>; rel={rel}"
+        if as_:
+            link += f"; as={as_}"
+        links.append(link)
+
+    def visit(key):
+        # Chunks can import each other, so guard on the key, not the URL.
+        if key in visited:
+            return
+        visited.add(key)
+        chunk = manifest.get(key)
+        if chunk is None:
+            return
+        add(chunk["file"], "modulepreload")
+        for css in chunk.get("css", []):
+            add(css, "preload", "style")
+        for imported in chunk.get("imports", []):
+            visit(imported)
+
+    for key, chunk in manifest.items():
+        if chunk.get("isEntry"):
+            visit(key)
+    return links
+
+
+def _load_index():
+    static_folder = app.static_folder
+    try:
+        with open(os.path.join(static_folder, "index.html"), "rb") as f:
+            body = f.read()
+    except FileNotFoundError:
+        raise NotFound()
+
+    links = []
+    manifest_path = os.path.join(static_folder, MANIFEST_PATH)
+    if os.path.isfile(manifest_path):
+        with open(manifest_path) as f:
+            links = _preload_links(json.load(f))
+
+    return body, hashlib.sha1(body).hexdigest(), ", ".join(links)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def index_response():
+    """Response for ``index.html``, read from disk on first use."""
+    global _index
+
+    if app.debug:
+        index = _load_index()
+    else:
+        with _index_lock:
+            if _index is None:
+                _index = _load_index()
+        index = _index
+
+    body, etag, links = index
+    response = make_response(body)
+    response.mimetype = "text/html"
+    response.set_etag(etag)
+    if links:
+        response.headers["Link"] = links
+    return response.make_conditional(request)
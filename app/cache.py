@@ -0,0 +1,262 @@
+"""
+Response caching.
+
+``response_cache.cached`` stores the body and headers of successful GET
+responses, keyed by endpoint, query args, negotiated format and (optionally) the
+requesting user. Each cached route declares the data tags it depends on; a write
+calls ``response_cache.invalidate(tag)``, which bumps that tag's
+generation so every key built from the old generation is never read
+again and ages out through LRU/TTL eviction.
+
+Two backends are available through ``CACHE_BACKEND``:
+
+* ``memory``: a per-worker LRU. Cheapest, but invalidations only reach
+  the worker that handled the write; other workers serve stale entries
+  for at most the route's TTL.
+* ``sqlite``: a local SQLite file shared by all workers on the host, so
+  entries and invalidations are seen by every gunicorn worker.
+
+``none`` disables caching.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import make_response, request
+
+from app import app
+from app.formats import response_format
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries also expire ``ttl`` seconds after they
+    were stored. Safe to share between threads of one worker.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class MemoryBackend(TTLCache):
+    """In-process backend: a TTLCache plus per-tag generation counters."""
+
+    def __init__(self, max_entries, ttl):
+        super().__init__(max_entries, ttl)
+        self._generations = {}
+
+    def generation(self, tag):
+        return self._generations.get(tag, 0)
+
+    def bump(self, tag):
+        with self._lock:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+
+
+class SQLiteBackend:
+    """
+    Backend stored in a local SQLite file so all workers on a host share
+    entries and invalidations. Each thread keeps its own connection.
+    """
+
+    # Evict expired and least recently used entries every this many writes.
+    EVICT_EVERY = 64
+
+    def __init__(self, path, max_entries, ttl):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes = 0
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entry ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_cache_entry_accessed_at "
+                "ON cache_entry (accessed_at)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_generation ("
+                "tag TEXT PRIMARY KEY, generation INTEGER NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, expires_at FROM cache_entry WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] < now:
+            conn.execute("DELETE FROM cache_entry WHERE key = ?", (key,))
+            return None
+        conn.execute(
+            "UPDATE cache_entry SET accessed_at = ? WHERE key = ?", (now, key)
+        )
+        return row[0]
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        conn = self._conn()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entry (key, value, expires_at, accessed_at) "
+            "VALUES (?, ?, ?, ?)",
+            (key, value, now + ttl, now),
+        )
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM cache_entry WHERE expires_at < ?", (now,))
+        conn.execute(
+            "DELETE FROM cache_entry WHERE key IN ("
+            "SELECT key FROM cache_entry ORDER BY accessed_at DESC "
+            "LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def generation(self, tag):
+        row = self._conn().execute(
+            "SELECT generation FROM cache_generation WHERE tag = ?", (tag,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, tag):
+        self._conn().execute(
+            "INSERT INTO cache_generation (tag, generation) VALUES (?, 1) "
+            "ON CONFLICT (tag) DO UPDATE SET generation = generation + 1",
+            (tag,),
+        )
+
+    def clear(self):
+        self._conn().execute("DELETE FROM cache_entry")
+
+
+class ResponseCache:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def _key(self, tags, user_id):
+        parts = [
+            request.endpoint,
+            sorted(request.view_args.items()),
+            sorted(request.args.items(multi=True)),
+            response_format(),
+            [self.backend.generation(tag) for tag in tags],
+            user_id,
+        ]
+        return hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()
+
+    @staticmethod
+    def _encode(response):
+        meta = {
+            "status": response.status_code,
+            "headers": [
+                [name, value]
+                for name, value in response.headers.items()
+                if name != "Content-Length"
+            ],
+        }
+        return json.dumps(meta).encode() + b"\n" + response.get_data()
+
+    @staticmethod
+    def _decode(value):
+        meta, body = bytes(value).split(b"\n", 1)
+        meta = json.loads(meta)
+        return make_response(body, meta["status"], meta["headers"])
+
+    def cached(self, tags, ttl=None, per_user=False):
+        """
+        Cache a GET view's successful responses. ``tags`` name the data the
+        response depends on. With ``per_user`` the first positional
+        argument (the caller's id from ``jwt_required``) is part of the key.
+        """
+
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                if self.backend is None:
+                    return f(*args, **kwargs)
+
+                key = self._key(tags, args[0] if per_user else None)
+                value = self.backend.get(key)
+                if value is not None:
+                    response = self._decode(value)
+                    return response.make_conditional(request)
+
+                response = make_response(f(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    self.backend.set(key, self._encode(response), ttl)
+                return response
+
+            return wrapper
+
+        return decorator
+
+    def invalidate(self, *tags):
+        if self.backend is None:
+            return
+        for tag in tags:
+            self.backend.bump(tag)
+
+
+def make_backend(config):
+    backend = config["CACHE_BACKEND"]
+    if backend == "memory":
+        return MemoryBackend(config["CACHE_MAX_ENTRIES"], config["CACHE_DEFAULT_TTL"])
+    if backend == "sqlite":
+        return SQLiteBackend(
+            config["CACHE_SQLITE_PATH"],
+            config["CACHE_MAX_ENTRIES"],
+            config["CACHE_DEFAULT_TTL"],
+        )
+    return None
+
+
+response_cache = ResponseCache(make_backend(app.config))
@@ -0,0 +1,49 @@
+"""
+Flask CLI commands, run with ``flask <command>``.
+"""
+
+import time
+
+import click
+
+from app import app, db
+from app.cache import response_cache
+from app.favourites import rebuild_favourite_counts, rollup_hourly
+from app.matching import rebuild_match_table
+
+
+@app.cli.command("rebuild-matches")
+@click.option("--batch-size", default=500, show_default=True)
+def rebuild_matches(batch_size):
+    """Recompute the profile_match table for every profile."""
+    total = 0
+    for total in rebuild_match_table(batch_size):
+        click.echo(f"Processed {total} profiles")
+    click.echo(f"Rebuilt matches for {total} profiles.")
+
+
+@app.cli.command("rebuild-favourite-counts")
+def rebuild_favourite_counts_command():
+    """Recompute users.favourite_count from the favourite table."""
+    updated = rebuild_favourite_counts()
+    db.session.commit()
+    click.echo(f"Rebuilt favourite counts for {updated} users.")
+
+
+@app.cli.command("rollup-favourites")
+@click.option(
+    "--interval",
+    type=int,
+    default=None,
+    help="Keep running, rolling up every this many seconds.",
+)
+def rollup_favourites(interval):
+    """Refresh the hourly favourite counts behind /api/users/trending."""
+    while True:
+        written = rollup_hourly()
+        db.session.commit()
+        response_cache.invalidate("trending")
+        click.echo(f"Rolled up {written} hourly favourite buckets.")
+        if interval is None:
+            break
+        time.sleep(interval)
@@ -0,0 +1,118 @@
+"""
+Response compression.
+
+Dynamic responses (API JSON and MessagePack, rendered HTML) are compressed
+in an ``after_request`` hook with brotli or gzip, whichever the client
+prefers in ``Accept-Encoding``. Bodies below ``COMPRESS_MIN_SIZE`` are
+left alone, since the framing overhead outweighs the saving.
+
+Files under the static folder are never compressed per request. The Vite
+build writes ``.br`` and ``.gz`` siblings next to each asset and
+``send_static_file`` serves the best one the client accepts.
+
+Brotli support is optional; without the ``brotli`` package only gzip is
+offered.
+"""
+
+import gzip
+import mimetypes
+import os
+
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+
+from app import app
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/msgpack",
+    "application/javascript",
+    "text/html",
+    "text/plain",
+    "text/css",
+    "image/svg+xml",
+}
+
+# Precompressed sibling suffix per encoding, in order of preference.
+STATIC_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def _encodings():
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def _accepted_encoding(offered):
+    return request.accept_encodings.best_match(offered)
+
+
+def _compress(data, encoding):
+    if encoding == "br":
+        level = min(max(app.config["COMPRESS_BROTLI_LEVEL"], 0), 11)
+        return brotli.compress(data, quality=level)
+    level = min(max(app.config["COMPRESS_GZIP_LEVEL"], 1), 9)
+    return gzip.compress(data, compresslevel=level)
+
+
+@app.after_request
+def compress_response(response):
+    if (
+        response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    data = response.get_data()
+    if len(data) < app.config["COMPRESS_MIN_SIZE"]:
+        return response
+
+    encoding = _accepted_encoding(_encodings())
+    if encoding is None:
+        return response
+
+    response.set_data(_compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    # The compressed bytes differ from the identity representation, so a
+    # strong validator would no longer be accurate.
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def send_static_file(filename):
+    """
+    Serve ``filename`` from the static folder, using a precompressed
+    ``.br``/``.gz`` sibling when one exists and the client accepts it.
+    """
+    static_folder = app.static_folder
+    available = []
+    for encoding, suffix in STATIC_SUFFIXES.items():
+        path = safe_join(static_folder, filename + suffix)
+        if path and os.path.isfile(path):
+            available.append(encoding)
+    encoding = _accepted_encoding(available) if available else None
+    if encoding is None:
+        response = app.send_static_file(filename)
+    else:
+        mimetype, _ = mimetypes.guess_type(filename)
+        response = send_from_directory(
+            static_folder,
+            filename + STATIC_SUFFIXES[encoding],
+            mimetype=mimetype or "application/octet-stream",
+            max_age=app.get_send_file_max_age(filename),
+        )
+        response.headers["Content-Encoding"] = encoding
+
+    if available:
+        response.vary.add("Accept-Encoding")
+    return response
@@ -0,0 +1,98 @@
+"""
+Conditional GET support.
+
+ETags are built from the per-row ``version`` counters (and row counts for
+collections), or for the profile listings from the indexed ``updated_at``
+columns, so they can be checked with a small query before the full result
+is loaded and serialized.
+"""
+
+import hashlib
+
+from flask import make_response, request
+from sqlalchemy import func, select
+
+from app import db
+from app.formats import response_format
+from app.models import User, Profile
+
+
+def not_modified(etag):
+    """Return a 304 response if the client already has ``etag``, else None."""
+    # If-None-Match uses weak comparison; compressed responses carry a
+    # weak ETag.
+    if request.if_none_match.contains_weak(etag):
+        response = make_response("", 304)
+        response.set_etag(etag)
+        return response
+    return None
+
+
+def _digest(*parts):
+    return hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def _variant():
+    """
+    ETag suffix for the representation selected by ``?fields=`` and the
+    negotiated response format.
+    """
+    fields = request.args.get("fields")
+    suffix = "-" + _digest(fields)[:12] if fields else ""
+    if response_format() != "json":
+        suffix += "-" + response_format()
+    return suffix
+
+
+def profile_etag(profile_id):
+    """ETag of a profile and its owner, or None if the profile is missing."""
+    row = (
+        db.session.query(Profile.version, User.version)
+        .join(User, Profile.user_id_fk == User.id)
+        .filter(Profile.id == profile_id)
+        .first()
+    )
+    if row is None:
+        return None
+    return f"profile-{profile_id}-{row[0]}-{row[1]}{_variant()}"
+
+
+def user_etag(user_id):
+    version = db.session.query(User.version).filter(User.id == user_id).scalar()
+    if version is None:
+        return None
+    return f"user-{user_id}-{version}{_variant()}"
+
+
+def user_profiles_etag(user_id):
+    count, versions = (
+        db.session.query(func.count(Profile.id), func.sum(Profile.version))
+        .filter(Profile.user_id_fk == user_id)
+        .one()
+    )
+    return f"user-{user_id}-profiles-{count}-{versions or 0}{_variant()}"
+
+
+def listing_etag(user_id):
+    """
+    ETag of a profile listing as seen by ``user_id``. Covers the latest
+    profile and user write plus the query string and response format,
+    since filters and cursors change the representation. Profiles and
+    users are never deleted, so every change to a listing moves one of the
+    two maxima, each read from the end of an index.
+
+    ``updated_at`` is stamped at flush, not commit. On PostgreSQL a write
+    that flushes before another but commits after it leaves the maximum
+    unchanged, so a listing that only it changed revalidates as current
+    until the next profile or user write. Writes flush just before they
+    commit, which keeps that window short.
+    """
+    profiles = select(func.max(Profile.updated_at)).scalar_subquery()
+    users = select(func.max(User.updated_at)).scalar_subquery()
+    latest = db.session.query(profiles, users).one()
+    return "listing-" + _digest(
+        user_id,
+        request.query_string.decode(),
+        response_format(),
+        *latest,
+    )
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,3 +17,85 @@ class Config(object):
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
     FLASK_ENV = os.environ.get("FLASK_ENV", "development")
+
+    # Response cache: "memory" (per worker), "sqlite" (shared by all
+    # workers on the host through CACHE_SQLITE_PATH) or "none".
+    CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+    CACHE_SQLITE_PATH = os.environ.get(
+        "CACHE_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "jamdate-cache.sqlite3")
+    )
+    CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 2048))
+    CACHE_DEFAULT_TTL = int(os.environ.get("CACHE_DEFAULT_TTL", 60))
+
+    # "sql" runs the match rules in the database, "numpy" uses the
+    # in-memory columnar engine (requires numpy to be installed).
+    MATCH_ENGINE = os.environ.get("MATCH_ENGINE", "sql")
+    MATCH_ENGINE_TTL = int(os.environ.get("MATCH_ENGINE_TTL", 300))
+    MATCH_BATCH_MAX_IDS = int(os.environ.get("MATCH_BATCH_MAX_IDS", 100))
+    PROFILES_PAGE_SIZE = int(os.environ.get("PROFILES_PAGE_SIZE", 20))
+    PROFILES_MAX_PAGE_SIZE = int(os.environ.get("PROFILES_MAX_PAGE_SIZE", 100))
+    PROFILES_STREAM_BATCH = int(os.environ.get("PROFILES_STREAM_BATCH", 500))
+    FACET_BIRTH_YEAR_BUCKET = int(os.environ.get("FACET_BIRTH_YEAR_BUCKET", 5))
+    FACET_CACHE_TTL = int(os.environ.get("FACET_CACHE_TTL", 30))
+    MATCHES_PAGE_SIZE = int(os.environ.get("MATCHES_PAGE_SIZE", 20))
+    MATCHES_MAX_PAGE_SIZE = int(os.environ.get("MATCHES_MAX_PAGE_SIZE", 100))
+
+    # Dynamic response compression. Responses smaller than
+    # COMPRESS_MIN_SIZE bytes are sent as is; levels are clamped to what
+    # each codec accepts (gzip 1-9, brotli 0-11).
+    COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+    COMPRESS_GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", 6))
+    COMPRESS_BROTLI_LEVEL = int(os.environ.get("COMPRESS_BROTLI_LEVEL", 4))
+
+    # Serve the content-hashed files under /assets/ with a long-lived,
+    # immutable Cache-Control instead of revalidating them on every load.
+    STATIC_IMMUTABLE_ASSETS = (
+        os.environ.get("STATIC_IMMUTABLE_ASSETS", "true").lower() == "true"
+    )
+    STATIC_ASSETS_MAX_AGE = int(os.environ.get("STATIC_ASSETS_MAX_AGE", 31536000))
+    FAVOURITES_BULK_MAX_IDS = int(os.environ.get("FAVOURITES_BULK_MAX_IDS", 100))
+    TRENDING_PAGE_SIZE = int(os.environ.get("TRENDING_PAGE_SIZE", 10))
+    TRENDING_MAX_PAGE_SIZE = int(os.environ.get("TRENDING_MAX_PAGE_SIZE", 100))
+    TRENDING_CACHE_TTL = int(os.environ.get("TRENDING_CACHE_TTL", 60))
+
+    # "memory" keeps an in-process index of the favourite graph for mutual
+    # favourite lookups; "sql" answers them from the favourite indexes.
+    FAVOURITE_GRAPH = os.environ.get("FAVOURITE_GRAPH", "sql")
+    FAVOURITE_GRAPH_TTL = int(os.environ.get("FAVOURITE_GRAPH_TTL", 300))
+
+    # Seconds between re-reads of the revoked_token table by each worker,
+    # and between deletions of expired revocations.
+    REVOCATION_SYNC_INTERVAL = int(os.environ.get("REVOCATION_SYNC_INTERVAL", 5))
+    REVOCATION_PRUNE_INTERVAL = int(os.environ.get("REVOCATION_PRUNE_INTERVAL", 3600))
+
+    # Verified JWTs kept per worker to skip repeat signature checks. An
+    # entry lives for at most this many seconds, and never past its exp.
+    AUTH_TOKEN_CACHE_SIZE = int(os.environ.get("AUTH_TOKEN_CACHE_SIZE", 4096))
+    AUTH_TOKEN_CACHE_TTL = int(os.environ.get("AUTH_TOKEN_CACHE_TTL", 300))
+
+    # Password hashing, e.g. "pbkdf2:sha256:600000" or "scrypt". Hashes made
+    # with another method are replaced at the user's next login.
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "pbkdf2:sha256")
+
+    # Login and registration throttling: "memory" (per worker), "sqlite"
+    # (shared by all workers on the host) or "none". Each client IP and
+    # each username may make BURST attempts at once, refilled at
+    # PER_MINUTE attempts a minute.
+    RATELIMIT_BACKEND = os.environ.get("RATELIMIT_BACKEND", "memory")
+    # Reverse proxies in front of the app whose X-Forwarded-For and
+    # X-Forwarded-Proto headers are trusted, so the per-IP limit sees the
+    # client's address. Render adds one; nothing does in development.
+    PROXY_FIX_HOPS = int(
+        os.environ.get("PROXY_FIX_HOPS", 0 if FLASK_ENV == "development" else 1)
+    )
+    RATELIMIT_SQLITE_PATH = os.environ.get(
+        "RATELIMIT_SQLITE_PATH",
+        os.path.join(tempfile.gettempdir(), "jamdate-ratelimit.sqlite3"),
+    )
+    RATELIMIT_MAX_ENTRIES = int(os.environ.get("RATELIMIT_MAX_ENTRIES", 10000))
+    RATELIMIT_IP_BURST = int(os.environ.get("RATELIMIT_IP_BURST", 20))
+    RATELIMIT_IP_PER_MINUTE = int(os.environ.get("RATELIMIT_IP_PER_MINUTE", 20))
+    RATELIMIT_USERNAME_BURST = int(os.environ.get("RATELIMIT_USERNAME_BURST", 5))
+    RATELIMIT_USERNAME_PER_MINUTE = int(
+        os.environ.get("RATELIMIT_USERNAME_PER_MINUTE", 5)
+    )
@@ -0,0 +1,236 @@
+"""
+Favourite writes.
+
+Favourites are added with a single ``INSERT ... SELECT ... ON CONFLICT DO
+NOTHING`` against the unique (user_id_fk, fav_user_id_fk) constraint, so
+repeated or concurrent requests cannot create duplicate rows and no
+existence check is needed first. Ids that are not users, and the user's
+own id, are dropped by the SELECT.
+
+Each write also adjusts ``users.favourite_count`` for the rows it actually
+inserted or deleted (taken from ``RETURNING``), in the same transaction,
+so the leaderboard can read the counter instead of grouping the favourite
+table, and to the in-memory favourite graph when it is enabled. The
+caller commits.
+
+Trending counts come from ``favourite_hourly``, a per-user count of
+favourites received in each UTC hour. ``rollup_hourly`` refreshes it from
+the favourite table's ``created_at`` index and is run periodically by
+``flask rollup-favourites``; requests only sum a few hundred buckets.
+Removing a favourite takes it back out of its hour's bucket, so the counts
+are of current favourites and unfavouriting and favouriting again does not
+count twice.
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from sqlalchemy import delete, func, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import aliased
+
+from app import db
+from app.favourite_graph import get_graph
+from app.models import User, Favourite, FavouriteHourly, utcnow
+
+DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def _adjust_counts(fav_user_ids, delta):
+    if fav_user_ids:
+        db.session.execute(
+            update(User)
+            .where(User.id.in_(fav_user_ids))
+            .values(favourite_count=User.favourite_count + delta)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def add_favourites(user_id, fav_user_ids):
+    """Favourite ``fav_user_ids`` for ``user_id``, returning the number added."""
+    if not fav_user_ids:
+        return 0
+
+    dialect = db.session.get_bind().dialect.name
+    candidates = select(literal(user_id), User.id).where(
+        User.id.in_(fav_user_ids), User.id != user_id
+    )
+    stmt = (
+        DIALECT_INSERTS[dialect](Favourite)
+        .from_select(["user_id_fk", "fav_user_id_fk"], candidates)
+        .on_conflict_do_nothing(index_elements=["user_id_fk", "fav_user_id_fk"])
+        .returning(Favourite.fav_user_id_fk)
+    )
+    added = db.session.execute(stmt).scalars().all()
+    _adjust_counts(added, 1)
+
+    graph = get_graph()
+    if graph is not None:
+        graph.add(user_id, added)
+    return len(added)
+
+
+def remove_favourites(user_id, fav_user_ids):
+    """Unfavourite ``fav_user_ids`` for ``user_id``, returning the number removed."""
+    if not fav_user_ids:
+        return 0
+
+    stmt = (
+        delete(Favourite)
+        .where(
+            Favourite.user_id_fk == user_id, Favourite.fav_user_id_fk.in_(fav_user_ids)
+        )
+        .returning(Favourite.fav_user_id_fk, Favourite.created_at)
+    )
+    rows = db.session.execute(stmt).all()
+    removed = [fav_user_id for fav_user_id, _created_at in rows]
+    _adjust_counts(removed, -1)
+    _remove_from_hourly(rows)
+
+    graph = get_graph()
+    if graph is not None:
+        graph.remove(user_id, removed)
+    return len(removed)
+
+
+def rebuild_favourite_counts():
+    """Recompute every user's favourite_count from the favourite table."""
+    count = (
+        select(func.count(Favourite.id))
+        .where(Favourite.fav_user_id_fk == User.id)
+        .scalar_subquery()
+    )
+    return db.session.execute(
+        update(User)
+        .values(favourite_count=count)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+TRENDING_WINDOWS = {
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30),
+}
+
+# Buckets older than the longest window are pruned.
+HOURLY_RETENTION = max(TRENDING_WINDOWS.values())
+
+
+def _floor_hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _hour_bucket(column):
+    """SQL expression truncating ``column`` to the start of its hour."""
+    if db.session.get_bind().dialect.name == "sqlite":
+        # Same text format SQLAlchemy uses for DateTime on SQLite.
+        return func.strftime("%Y-%m-%d %H:00:00.000000", column)
+    return func.date_trunc("hour", column)
+
+
+def _remove_from_hourly(rows):
+    """
+    Take deleted favourites, as ``(fav_user_id, created_at)`` rows, out of
+    the hourly buckets they were rolled up into. Buckets not rolled up yet
+    are recounted from the favourite table, which no longer has the rows.
+    """
+    buckets = Counter(
+        (_floor_hour(created_at), fav_user_id)
+        for fav_user_id, created_at in rows
+        if created_at is not None
+    )
+    for (hour, fav_user_id), count in buckets.items():
+        db.session.execute(
+            update(FavouriteHourly)
+            .where(
+                FavouriteHourly.hour == hour,
+                FavouriteHourly.fav_user_id_fk == fav_user_id,
+            )
+            .values(count=FavouriteHourly.count - count)
+            .execution_options(synchronize_session=False)
+        )
+    if buckets:
+        db.session.execute(
+            delete(FavouriteHourly)
+            .where(
+                FavouriteHourly.fav_user_id_fk.in_({key[1] for key in buckets}),
+                FavouriteHourly.count <= 0,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+
+def rollup_hourly():
+    """
+    Recount the hourly buckets from the latest rolled-up hour onwards and
+    prune buckets past the retention window. The previous hour is recounted
+    too, so favourites committed just after a rollup are not missed.
+    Returns the number of buckets written. The caller commits.
+    """
+    oldest = _floor_hour(utcnow() - HOURLY_RETENTION)
+    latest = db.session.query(func.max(FavouriteHourly.hour)).scalar()
+    since = max(latest - timedelta(hours=1), oldest) if latest else oldest
+
+    db.session.execute(
+        delete(FavouriteHourly).where(
+            (FavouriteHourly.hour >= since) | (FavouriteHourly.hour < oldest)
+        )
+    )
+
+    hour = _hour_bucket(Favourite.created_at)
+    counts = (
+        select(hour, Favourite.fav_user_id_fk, func.count())
+        .where(Favourite.created_at >= since)
+        .group_by(hour, Favourite.fav_user_id_fk)
+    )
+    stmt = FavouriteHourly.__table__.insert().from_select(
+        ["hour", "fav_user_id_fk", "count"], counts
+    )
+    return db.session.execute(stmt).rowcount
+
+
+def trending_query(window, projection):
+    """
+    Users selected with ``projection`` plus ``favourite_count``, the number
+    of favourites they received in ``window``, most favourited first.
+    """
+    since = _floor_hour(utcnow() - TRENDING_WINDOWS[window])
+    total = func.sum(FavouriteHourly.count)
+    counts = (
+        select(FavouriteHourly.fav_user_id_fk, total.label("favourite_count"))
+        .where(FavouriteHourly.hour >= since)
+        .group_by(FavouriteHourly.fav_user_id_fk)
+        .subquery()
+    )
+    return (
+        projection.query(counts.c.favourite_count)
+        .join(counts, counts.c.fav_user_id_fk == User.id)
+        .order_by(counts.c.favourite_count.desc(), User.id.desc())
+    )
+
+
+def mutual_favourites_query(user_id, projection):
+    """
+    Users selected with ``projection`` whom ``user_id`` favourited and who
+    favourited ``user_id`` back, by id.
+    """
+    graph = get_graph()
+    if graph is not None:
+        return (
+            projection.query()
+            .filter(User.id.in_(graph.mutual(user_id)))
+            .order_by(User.id)
+        )
+
+    back = aliased(Favourite)
+    return (
+        projection.query()
+        .join(Favourite, Favourite.fav_user_id_fk == User.id)
+        .join(back, (back.user_id_fk == User.id) & (back.fav_user_id_fk == user_id))
+        .filter(Favourite.user_id_fk == user_id)
+        .order_by(User.id)
+    )
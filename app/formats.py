@@ -0,0 +1,56 @@
+"""
+Response format negotiation.
+
+``jsonify`` goes through ``app.json.response``, so installing
+``NegotiatingJSONProvider`` as ``app.json`` lets every route answer with
+MessagePack when the client prefers ``application/msgpack`` in its
+``Accept`` header, and with JSON otherwise. Datetimes are packed as
+native MessagePack timestamps (naive values are taken to be UTC).
+
+MessagePack support is optional; without the ``msgpack`` package every
+response is JSON.
+"""
+
+from datetime import datetime, timezone
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+JSON_MIMETYPE = "application/json"
+MSGPACK_MIMETYPE = "application/msgpack"
+
+
+def response_format():
+    """Return ``"msgpack"`` if the current request prefers it, else ``"json"``."""
+    if msgpack is None or not request:
+        return "json"
+    best = request.accept_mimetypes.best_match([JSON_MIMETYPE, MSGPACK_MIMETYPE])
+    return "msgpack" if best == MSGPACK_MIMETYPE else "json"
+
+
+def _msgpack_default(o):
+    if isinstance(o, datetime):
+        return o.replace(tzinfo=timezone.utc)
+    return DefaultJSONProvider.default(o)
+
+
+class NegotiatingJSONProvider(DefaultJSONProvider):
+    def response(self, *args, **kwargs):
+        if response_format() == "msgpack":
+            body = msgpack.packb(
+                self._prepare_response_obj(args, kwargs),
+                default=_msgpack_default,
+                datetime=True,
+            )
+            response = self._app.response_class(body, mimetype=MSGPACK_MIMETYPE)
+        else:
+            response = super().response(*args, **kwargs)
+
+        if msgpack is not None:
+            response.vary.add("Accept")
+        return response
@@ -0,0 +1,186 @@
+"""
+Optional in-memory columnar engine for bulk match scoring.
+
+Profile attributes are kept as NumPy column arrays, with the categorical
+``MATCH_FIELDS`` dictionary-encoded to ints, so the matching rules run as
+vectorised operations over every candidate at once instead of building an
+ORM object per row. Enable it with ``MATCH_ENGINE=numpy``; without NumPy
+installed, matching falls back to the SQL query in ``app.matching``.
+
+Each worker holds its own copy, read over its own connection so it only
+ever holds committed rows. Before a profile's matches are recomputed,
+``load_changed`` applies the profiles whose ``updated_at`` is newer than
+the snapshot, less ``CHANGED_OVERLAP`` to allow for transactions that
+stamped ``updated_at`` earlier but committed later. The whole snapshot is
+also reloaded once it is older than ``MATCH_ENGINE_TTL`` seconds.
+"""
+
+import threading
+import time
+from datetime import timedelta
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+from sqlalchemy import func, select
+
+from app import app, db
+from app.models import Profile
+
+INITIAL_CAPACITY = 1024
+CHANGED_OVERLAP = timedelta(seconds=60)
+
+
+class ColumnarMatchEngine:
+    def __init__(self, match_fields, birth_year_window, min_height_diff, max_height_diff,
+                 min_matched_fields):
+        self.match_fields = list(match_fields)
+        self.birth_year_window = birth_year_window
+        self.min_height_diff = min_height_diff
+        self.max_height_diff = max_height_diff
+        self.min_matched_fields = min_matched_fields
+
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._seen_at = None  # latest updated_at in the snapshot
+        self._reset(INITIAL_CAPACITY)
+
+    def _reset(self, capacity):
+        self._size = 0
+        self._rows = {}  # profile id -> row index
+        # One value -> code dictionary per match field. None gets a code of
+        # its own, so two missing values agree as they do in SQL.
+        self._codes = [{} for _ in self.match_fields]
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.user_ids = np.zeros(capacity, dtype=np.int64)
+        self.birth_years = np.full(capacity, np.nan)
+        self.heights = np.full(capacity, np.nan)
+        self.fields = np.zeros((capacity, len(self.match_fields)), dtype=np.int32)
+
+    def _grow(self):
+        capacity = len(self.ids) * 2
+        self.ids = np.resize(self.ids, capacity)
+        self.user_ids = np.resize(self.user_ids, capacity)
+        self.birth_years = np.resize(self.birth_years, capacity)
+        self.heights = np.resize(self.heights, capacity)
+        self.fields = np.resize(self.fields, (capacity, len(self.match_fields)))
+
+    def _encode(self, values):
+        encoded = []
+        for codes, value in zip(self._codes, values):
+            encoded.append(codes.setdefault(value, len(codes)))
+        return encoded
+
+    def _write_row(self, profile_id, user_id, birth_year, height, values):
+        row = self._rows.get(profile_id)
+        if row is None:
+            if self._size == len(self.ids):
+                self._grow()
+            row = self._size
+            self._rows[profile_id] = row
+            self._size += 1
+
+        self.ids[row] = profile_id
+        self.user_ids[row] = user_id
+        # Missing (or zero) values never match, same as the SQL rules.
+        self.birth_years[row] = birth_year or np.nan
+        self.heights[row] = height or np.nan
+        self.fields[row] = self._encode(values)
+
+    def _select(self):
+        columns = [getattr(Profile, field) for field in self.match_fields]
+        return select(
+            Profile.updated_at,
+            Profile.id,
+            Profile.user_id_fk,
+            Profile.birth_year,
+            Profile.height,
+            *columns,
+        )
+
+    def _write_rows(self, rows):
+        for updated_at, profile_id, user_id, birth_year, height, *values in rows:
+            self._write_row(profile_id, user_id, birth_year, height, values)
+            if updated_at and (self._seen_at is None or updated_at > self._seen_at):
+                self._seen_at = updated_at
+
+    def load(self):
+        """Reload every committed profile in one column projection."""
+        with db.engine.connect() as conn:
+            count = conn.execute(select(func.count(Profile.id))).scalar()
+            rows = conn.execution_options(yield_per=5000).execute(self._select())
+            with self._lock:
+                self._reset(max(INITIAL_CAPACITY, count))
+                self._seen_at = None
+                self._write_rows(rows)
+                self._loaded_at = time.monotonic()
+
+    def load_changed(self):
+        """Apply profiles committed since the snapshot was taken."""
+        query = self._select()
+        if self._seen_at is not None:
+            query = query.where(Profile.updated_at > self._seen_at - CHANGED_OVERLAP)
+        with db.engine.connect() as conn:
+            rows = conn.execute(query).all()
+        with self._lock:
+            self._write_rows(rows)
+
+    def ensure_fresh(self, ttl):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > ttl:
+            self.load()
+
+    def matches(self, current):
+        """
+        Return ``(profile_id, birth_year, height, matched_fields)`` for each
+        profile matching ``current``.
+        """
+        if not current.birth_year or not current.height:
+            return []
+
+        values = [getattr(current, field) for field in self.match_fields]
+        with self._lock:
+            n = self._size
+            target = np.array(self._encode(values), dtype=np.int32)
+
+            mask = (self.ids[:n] != current.id) & (self.user_ids[:n] != current.user_id_fk)
+            mask &= np.abs(self.birth_years[:n] - current.birth_year) <= self.birth_year_window
+            height_diff = np.abs(self.heights[:n] - current.height)
+            mask &= (height_diff >= self.min_height_diff) & (height_diff < self.max_height_diff)
+
+            agree = self.fields[:n] == target
+            mask &= agree.sum(axis=1) >= self.min_matched_fields
+
+            rows = np.flatnonzero(mask)
+            ids = self.ids[rows].tolist()
+            birth_years = self.birth_years[rows].astype(np.int64).tolist()
+            heights = self.heights[rows].tolist()
+            agree = agree[rows].tolist()
+
+        return [
+            (profile_id, birth_year, height,
+             [f for f, hit in zip(self.match_fields, flags) if hit])
+            for profile_id, birth_year, height, flags in zip(ids, birth_years, heights, agree)
+        ]
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine(**rules):
+    """
+    Return this worker's engine, loading it on first use, or None when
+    the engine is disabled or NumPy is not installed.
+    """
+    global _engine
+
+    if app.config["MATCH_ENGINE"] != "numpy" or np is None:
+        return None
+
+    with _engine_lock:
+        if _engine is None:
+            _engine = ColumnarMatchEngine(**rules)
+    _engine.ensure_fresh(app.config["MATCH_ENGINE_TTL"])
+    return _engine
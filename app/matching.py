@@ -0,0 +1,251 @@
+"""
+Profile matching rules.
+
+Two profiles match when their owners were born within five years of each
+other, their heights differ by 3-10 inches and at least three of the
+``MATCH_FIELDS`` agree. The rules are expressed as SQL so the whole
+filter runs inside the database in a single query, or as vectorised
+column operations when the optional engine in ``app.match_engine`` is on.
+
+Results are persisted in the ``profile_match`` table, one row per
+direction, and only recomputed for a profile when it is written.
+"""
+
+from sqlalchemy import and_, case, delete, insert, or_
+
+from app import db
+from app.models import User, Profile, ProfileMatch
+from app.match_engine import get_engine
+from app.pagination import keyset_query, paginate
+from app.serializers import PROFILE
+
+MATCH_FIELDS = [
+    "fav_cuisine",
+    "fav_colour",
+    "fav_school_subject",
+    "political",
+    "religious",
+    "family_oriented",
+]
+
+MIN_MATCHED_FIELDS = 3
+BIRTH_YEAR_WINDOW = 5
+
+# Height is stored in metres. The original rule truncated the difference
+# in inches, so anything from 3 up to (but not including) 11 inches passed.
+INCHES_PER_METRE = 39.37
+MIN_HEIGHT_DIFF = 3 / INCHES_PER_METRE
+MAX_HEIGHT_DIFF = 11 / INCHES_PER_METRE
+
+
+def match_query(current):
+    """
+    Build the query returning ``(profile_id, birth_year, height, *field_flags)``
+    rows for every
+    profile compatible with ``current``. Returns None when ``current`` lacks
+    the birth year or height the rules depend on.
+    """
+    if not current.birth_year or not current.height:
+        return None
+
+    # Comparing against None renders as IS NULL, which keeps the old
+    # Python semantics where two missing values counted as agreeing.
+    flags = [
+        case((getattr(Profile, field) == getattr(current, field), 1), else_=0)
+        for field in MATCH_FIELDS
+    ]
+    matched_count = sum(flags[1:], flags[0])
+
+    return db.session.query(
+        Profile.id,
+        Profile.birth_year,
+        Profile.height,
+        *(flag.label(field) for flag, field in zip(flags, MATCH_FIELDS)),
+    ).filter(
+        Profile.id != current.id,
+        Profile.user_id_fk != current.user_id_fk,
+        Profile.birth_year.between(
+            current.birth_year - BIRTH_YEAR_WINDOW,
+            current.birth_year + BIRTH_YEAR_WINDOW,
+        ),
+        or_(
+            and_(
+                Profile.height >= current.height + MIN_HEIGHT_DIFF,
+                Profile.height < current.height + MAX_HEIGHT_DIFF,
+            ),
+            and_(
+                Profile.height <= current.height - MIN_HEIGHT_DIFF,
+                Profile.height > current.height - MAX_HEIGHT_DIFF,
+            ),
+        ),
+        matched_count >= MIN_MATCHED_FIELDS,
+    )
+
+
+def _columnar_engine():
+    return get_engine(
+        match_fields=MATCH_FIELDS,
+        birth_year_window=BIRTH_YEAR_WINDOW,
+        min_height_diff=MIN_HEIGHT_DIFF,
+        max_height_diff=MAX_HEIGHT_DIFF,
+        min_matched_fields=MIN_MATCHED_FIELDS,
+    )
+
+
+def _catch_up_engine():
+    """Apply committed profile changes to the columnar engine, if enabled."""
+    engine = _columnar_engine()
+    if engine is not None:
+        engine.load_changed()
+
+
+def find_matches(current):
+    """
+    Return ``(profile_id, birth_year, height, matched_fields)`` for each
+    profile matching ``current``, using the columnar engine when enabled.
+    """
+    engine = _columnar_engine()
+    if engine is not None:
+        return engine.matches(current)
+
+    query = match_query(current)
+    if query is None:
+        return []
+
+    matches = []
+    for profile_id, birth_year, height, *flags in query.all():
+        matched_fields = [
+            field for field, flag in zip(MATCH_FIELDS, flags) if flag
+        ]
+        matches.append((profile_id, birth_year, height, matched_fields))
+    return matches
+
+
+def match_score(current, birth_year, height, matched_fields):
+    """
+    Compatibility score stored alongside each match: one point per matched
+    field, plus up to one point each for closeness in age and in height
+    within the allowed bands.
+    """
+    age_closeness = 1 - abs(birth_year - current.birth_year) / (BIRTH_YEAR_WINDOW + 1)
+    height_closeness = 1 - (abs(height - current.height) - MIN_HEIGHT_DIFF) / (
+        MAX_HEIGHT_DIFF - MIN_HEIGHT_DIFF
+    )
+    return round(len(matched_fields) + age_closeness + height_closeness, 4)
+
+
+def _match_rows(current):
+    rows = []
+    for profile_id, birth_year, height, matched_fields in find_matches(current):
+        rows.append(
+            {
+                "profile_a": current.id,
+                "profile_b": profile_id,
+                "matched_fields": ",".join(matched_fields),
+                "score": match_score(current, birth_year, height, matched_fields),
+            }
+        )
+    return rows
+
+
+def refresh_profile_matches(profile):
+    """
+    Recompute the stored matches of one profile in both directions.
+    The caller owns the transaction and must commit afterwards.
+    """
+    db.session.flush()
+    # Score against other workers' committed writes, not a stale snapshot.
+    _catch_up_engine()
+
+    db.session.execute(
+        delete(ProfileMatch).where(
+            (ProfileMatch.profile_a == profile.id)
+            | (ProfileMatch.profile_b == profile.id)
+        )
+    )
+
+    rows = _match_rows(profile)
+    reverse = [
+        dict(row, profile_a=row["profile_b"], profile_b=row["profile_a"])
+        for row in rows
+    ]
+    if rows:
+        db.session.execute(insert(ProfileMatch), rows + reverse)
+
+
+def rebuild_match_table(batch_size=500):
+    """
+    Recompute every stored match, committing after each batch of
+    profiles. Each profile writes its own outgoing rows, so both
+    directions are covered once every batch has run. Yields the number
+    of profiles processed so far after each batch.
+    """
+    db.session.execute(delete(ProfileMatch))
+    db.session.commit()
+
+    total = 0
+    last_id = 0
+    while True:
+        batch = (
+            Profile.query.filter(Profile.id > last_id)
+            .order_by(Profile.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+
+        _catch_up_engine()
+        rows = []
+        for profile in batch:
+            rows.extend(_match_rows(profile))
+        if rows:
+            db.session.execute(insert(ProfileMatch), rows)
+        db.session.commit()
+
+        total += len(batch)
+        last_id = batch[-1].id
+        yield total
+
+
+def _stored_match_query():
+    return (
+        PROFILE.query(
+            User.name,
+            ProfileMatch.matched_fields,
+            ProfileMatch.score,
+            ProfileMatch.profile_a,
+        )
+        .select_from(ProfileMatch)
+        .join(Profile, ProfileMatch.profile_b == Profile.id)
+        .join(User, Profile.user_id_fk == User.id)
+    )
+
+
+# Best matches first; profile id breaks ties so the order is stable.
+MATCH_ORDER = [(ProfileMatch.score, True), (ProfileMatch.profile_b, False)]
+
+
+def stored_matches(profile_id, limit, cursor=None):
+    """
+    Return one page of rows from the match table, best first, and the
+    cursor of the next page. The ``(profile_a, score)`` index lets the
+    database stop after ``limit`` rows. Serialize rows with
+    ``app.serializers.serialize_match``.
+    """
+    query = _stored_match_query().filter(ProfileMatch.profile_a == profile_id)
+    return paginate(query, MATCH_ORDER, lambda row: (row.score, row.id), limit, cursor)
+
+
+def stored_matches_for(profile_ids, batch_size=500):
+    """
+    Stream match rows for many profiles in one query, ordered by
+    ``profile_a`` and then best match first, so callers can group the rows
+    without holding the whole result in memory.
+    """
+    query = (
+        _stored_match_query()
+        .filter(ProfileMatch.profile_a.in_(profile_ids))
+        .order_by(ProfileMatch.profile_a)
+    )
+    return keyset_query(query, MATCH_ORDER).yield_per(batch_size)
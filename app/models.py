@@ -1,6 +1,14 @@
 from . import db
-from werkzeug.security import generate_password_hash
-from sqlalchemy.sql import func
+from .normalize import NORMALIZED_FIELDS, canonical
+from .passwords import hash_password
+from sqlalchemy.orm import validates
+from sqlalchemy.sql import func, literal_column
+from datetime import datetime, timezone
+
+
+def utcnow():
+    """Naive UTC timestamp, as stored in the profile and favourite tables."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 
 class User(db.Model):
@@ -9,15 +17,35 @@ class User(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
-    password = db.Column(db.String(128), nullable=False)
+    password = db.Column(db.String(255), nullable=False)
     name = db.Column(db.String(80))
     email = db.Column(db.String(80), unique=True)
     photo = db.Column(db.String(80))
     date_joined = db.Column(db.DateTime, default=func.now())
+    # Bumped on every update; used to build ETags. A plain counter rather
+    # than the mapper's version_id_col, which would also make concurrent
+    # updates of the same row fail instead of the last write winning.
+    version = db.Column(
+        db.Integer,
+        nullable=False,
+        server_default="1",
+        onupdate=literal_column("version + 1"),
+    )
+    # UTC time of the last ORM insert or update; its indexed max is the
+    # listing ETag.
+    updated_at = db.Column(db.DateTime, default=utcnow, onupdate=utcnow)
+    # Number of users who favourited this user, kept in step with the
+    # favourite table by app.favourites.
+    favourite_count = db.Column(db.Integer, nullable=False, server_default="0")
+
+    __table_args__ = (
+        db.Index("ix_users_favourite_count_id", "favourite_count", "id"),
+        db.Index("ix_users_updated_at", "updated_at"),
+    )
 
     def __init__(self, username, password, name=None, email=None, photo=None):
         self.username = username
-        self.password = generate_password_hash(password, method="pbkdf2:sha256")
+        self.password = hash_password(password)
         self.name = name
         self.email = email
         self.photo = photo
@@ -50,6 +78,14 @@ class User(db.Model):
 
 class Profile(db.Model):
     __tablename__ = 'profile'
+    __table_args__ = (
+        db.Index("ix_profile_birth_year_height", "birth_year", "height"),
+        db.Index("ix_profile_created_at_id", "created_at", "id"),
+        db.Index("ix_profile_sex", "sex"),
+        db.Index("ix_profile_race", "race"),
+        db.Index("ix_profile_parish", "parish"),
+        db.Index("ix_profile_updated_at", "updated_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id_fk = db.Column(
@@ -68,10 +104,23 @@ class Profile(db.Model):
     political = db.Column(db.Boolean, nullable=True)
     religious = db.Column(db.Boolean, nullable=True)
     family_oriented = db.Column(db.Boolean, nullable=True)
-    created_at = db.Column(db.DateTime, default=func.now())
+    # UTC, set in Python so it keeps microseconds on SQLite, where
+    # CURRENT_TIMESTAMP has whole seconds and keyset cursors (which carry
+    # microseconds) would not match rows created in the same second.
+    created_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+    # Bumped on every update; see User.version.
+    version = db.Column(
+        db.Integer,
+        nullable=False,
+        server_default="1",
+        onupdate=literal_column("version + 1"),
+    )
+    # UTC time of the last ORM insert or update; see User.updated_at.
+    updated_at = db.Column(db.DateTime, default=utcnow, onupdate=utcnow)
 
     user = db.relationship("User", foreign_keys=[user_id_fk])
 
+
     def __init__(
         self,
         user_id_fk,
@@ -104,6 +153,10 @@ class Profile(db.Model):
         self.religious = religious
         self.family_oriented = family_oriented
 
+    @validates(*NORMALIZED_FIELDS)
+    def normalize(self, key, value):
+        return canonical(key, value)
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -130,13 +183,65 @@ class Profile(db.Model):
 
 class Favourite(db.Model):
     __tablename__ = 'favourite'
+    __table_args__ = (
+        db.UniqueConstraint(
+            "user_id_fk", "fav_user_id_fk", name="uq_favourite_user_id_fk_fav_user_id_fk"
+        ),
+        # Who favourited a user; the unique constraint covers the reverse.
+        db.Index(
+            "ix_favourite_fav_user_id_fk_user_id_fk", "fav_user_id_fk", "user_id_fk"
+        ),
+        db.Index("ix_favourite_created_at", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id_fk = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     fav_user_id_fk = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    # UTC. NULL for favourites made before the column existed.
+    created_at = db.Column(db.DateTime, default=utcnow)
 
     user = db.relationship("User", foreign_keys=[user_id_fk])
     favourite_user = db.relationship("User", foreign_keys=[fav_user_id_fk])
 
     def __repr__(self):
-        return f"<Favourite {self.user_id_fk} -> {self.fav_user_id_fk}>"
\ No newline at end of file
+        return f"<Favourite {self.user_id_fk} -> {self.fav_user_id_fk}>"
+
+
+class FavouriteHourly(db.Model):
+    """Favourites received per user per UTC hour, rolled up from Favourite."""
+
+    __tablename__ = 'favourite_hourly'
+
+    hour = db.Column(db.DateTime, primary_key=True)
+    fav_user_id_fk = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    count = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<FavouriteHourly {self.hour} {self.fav_user_id_fk}: {self.count}>"
+
+
+class ProfileMatch(db.Model):
+    __tablename__ = 'profile_match'
+    __table_args__ = (
+        db.Index("ix_profile_match_profile_a_score", "profile_a", "score"),
+    )
+
+    profile_a = db.Column(db.Integer, db.ForeignKey("profile.id"), primary_key=True)
+    profile_b = db.Column(db.Integer, db.ForeignKey("profile.id"), primary_key=True)
+    matched_fields = db.Column(db.String(120), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        return f"<ProfileMatch {self.profile_a} <-> {self.profile_b}>"
+
+
+class RevokedToken(db.Model):
+    """A logged-out token, kept until the token itself would have expired."""
+
+    __tablename__ = 'revoked_token'
+
+    jti = db.Column(db.String(64), primary_key=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<RevokedToken {self.jti}>"
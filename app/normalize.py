@@ -0,0 +1,50 @@
+"""
+Canonical forms for free-text profile attributes.
+
+Values are stored trimmed, with runs of whitespace collapsed and in
+lowercase, with common spelling variants folded together, so equality
+filters, grouping and matching can compare columns directly and use
+plain indexes.
+"""
+
+NORMALIZED_FIELDS = (
+    "sex",
+    "race",
+    "parish",
+    "fav_cuisine",
+    "fav_colour",
+    "fav_school_subject",
+)
+
+ALIASES = {
+    "sex": {
+        "m": "male",
+        "man": "male",
+        "f": "female",
+        "woman": "female",
+    },
+    "fav_colour": {
+        "gray": "grey",
+    },
+}
+
+# "Saint Ann", "St Ann" and "St. Ann" are all stored as "st. ann".
+SAINT_PREFIXES = ("saint ", "st ")
+
+
+def canonical(field, value):
+    """Return the canonical form of ``value`` for ``field``."""
+    if value is None:
+        return None
+
+    value = " ".join(str(value).split()).lower()
+    if not value:
+        return None
+
+    if field == "parish":
+        for prefix in SAINT_PREFIXES:
+            if value.startswith(prefix):
+                value = "st. " + value[len(prefix):]
+                break
+
+    return ALIASES.get(field, {}).get(value, value)
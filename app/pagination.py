@@ -0,0 +1,120 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A page is described by an ordered list of sort keys, each a column paired
+with its direction. The cursor handed to clients is an opaque token that
+encodes the sort-key values of the last row on the page; the next page
+starts strictly after it, so every page costs the same index range scan.
+"""
+
+import base64
+import json
+import math
+from datetime import datetime
+
+from flask import request
+from sqlalchemy import and_, or_
+from sqlalchemy.types import DateTime, Integer, Numeric, String
+
+# Range of the 64-bit integer columns the sort keys can bind against.
+MIN_INTEGER, MAX_INTEGER = -(2**63), 2**63 - 1
+
+
+def encode_cursor(values):
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, keys):
+    """Decode ``cursor`` into sort-key values, raising ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise ValueError("Invalid cursor")
+
+    return [_decode_value(column, value) for (column, _), value in zip(keys, values)]
+
+
+def _decode_value(column, value):
+    """
+    Check a cursor value against its sort key's type, raising ValueError
+    if it could not have come from a row. Sort keys are never NULL.
+    """
+    column_type = column.type
+    if isinstance(column_type, DateTime):
+        if not isinstance(value, str):
+            raise ValueError("Invalid cursor")
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError("Invalid cursor")
+
+    if isinstance(value, bool):
+        valid = False
+    elif isinstance(column_type, Integer):
+        valid = isinstance(value, int) and MIN_INTEGER <= value <= MAX_INTEGER
+    elif isinstance(column_type, Numeric):
+        valid = isinstance(value, (int, float)) and math.isfinite(value)
+    elif isinstance(column_type, String):
+        valid = isinstance(value, str)
+    else:
+        # Untyped expressions, such as the PostgreSQL search relevance.
+        valid = isinstance(value, str) or (
+            isinstance(value, (int, float)) and math.isfinite(value)
+        )
+    if not valid:
+        raise ValueError("Invalid cursor")
+    return value
+
+
+def keyset_filter(keys, values):
+    """Filter selecting the rows that sort strictly after ``values``."""
+    clauses = []
+    for i, (column, descending) in enumerate(keys):
+        equal = [keys[j][0] == values[j] for j in range(i)]
+        after = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal, after))
+    return or_(*clauses)
+
+
+def page_args(default_size, max_size):
+    """
+    Read ``?limit=`` and ``?cursor=`` from the request. Raises ValueError
+    when the limit is not a positive integer.
+    """
+    limit = request.args.get("limit", default_size)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, max_size), request.args.get("cursor")
+
+
+def keyset_query(query, keys, cursor=None):
+    """Order ``query`` by ``keys``, starting after ``cursor`` if given."""
+    if cursor:
+        query = query.filter(keyset_filter(keys, decode_cursor(cursor, keys)))
+
+    order = [column.desc() if descending else column.asc() for column, descending in keys]
+    return query.order_by(*order)
+
+
+def paginate(query, keys, row_key, limit, cursor=None):
+    """
+    Apply keyset ordering to ``query`` and fetch one page. ``row_key``
+    maps a result row to its sort-key values. Returns ``(rows, next_cursor)``
+    where ``next_cursor`` is None on the last page.
+    """
+    rows = keyset_query(query, keys, cursor).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(row_key(rows[-1]))
+    return rows, next_cursor
@@ -0,0 +1,41 @@
+"""
+Password hashing.
+
+Hashes use ``PASSWORD_HASH_METHOD``, so the cost can be raised without a
+code change. A stored hash made with different parameters is reported by
+``needs_rehash`` so login can replace it.
+
+Hashing runs on the request thread. On sync gunicorn workers handing it
+to a pool would still block the worker until the hash is done, so the
+way to keep bursts of logins from stalling other requests is the hash
+cost itself and the rate limits on login and registration.
+"""
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app import app
+
+_current_method = None
+
+
+def hash_password(password):
+    return generate_password_hash(password, app.config["PASSWORD_HASH_METHOD"])
+
+
+def verify_password(pwhash, password):
+    return check_password_hash(pwhash, password)
+
+
+def _method_of(pwhash):
+    return pwhash.split("$", 1)[0]
+
+
+def needs_rehash(pwhash):
+    """Whether ``pwhash`` was made with other than the configured parameters."""
+    global _current_method
+
+    # The configured method may leave parameters such as the iteration
+    # count to werkzeug's defaults, so read them back from a real hash.
+    if _current_method is None:
+        _current_method = _method_of(hash_password(""))
+    return _method_of(pwhash) != _current_method
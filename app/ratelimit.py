@@ -0,0 +1,199 @@
+"""
+Token-bucket rate limiting for the authentication endpoints.
+
+Every login or registration attempt takes a token from two buckets, one
+for the client IP and one for the username submitted. A bucket holds at
+most ``burst`` tokens and refills at ``per_minute`` tokens a minute; an
+attempt that finds either bucket empty is answered with 429 and a
+``Retry-After`` header before any password hashing is done.
+
+Two backends are available through ``RATELIMIT_BACKEND``:
+
+* ``memory``: per-worker buckets. With several workers a client gets
+  that many times the configured rate.
+* ``sqlite``: buckets in a local SQLite file shared by all workers on
+  the host.
+
+``none`` disables limiting.
+"""
+
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import jsonify, request
+
+from app import app
+
+
+def _refill(tokens, updated_at, now, burst, rate):
+    return min(burst, tokens + (now - updated_at) * rate)
+
+
+def _take(tokens, burst, rate):
+    """Return ``(tokens_left, retry_after)``; retry_after is 0 if allowed."""
+    if tokens >= 1:
+        return tokens - 1, 0
+    return tokens, (1 - tokens) / rate
+
+
+class MemoryBackend:
+    """In-process buckets, least recently used evicted past ``max_entries``."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, burst, rate):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (burst, now))
+            tokens, retry_after = _take(
+                _refill(tokens, updated_at, now, burst, rate), burst, rate
+            )
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+
+class SQLiteBackend:
+    """
+    Buckets stored in a local SQLite file so all workers on a host share
+    them. Each thread keeps its own connection.
+    """
+
+    # Delete buckets that have refilled completely every this many takes.
+    PRUNE_EVERY = 256
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_bucket ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+                "updated_at REAL NOT NULL, full_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_rate_bucket_full_at "
+                "ON rate_bucket (full_at)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, burst, rate):
+        conn = self._conn()
+        now = time.time()
+        # IMMEDIATE takes the write lock up front, so concurrent takes on
+        # the same bucket are serialized.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM rate_bucket WHERE key = ?", (key,)
+            ).fetchone()
+            tokens = burst
+            if row is not None:
+                tokens = _refill(row[0], row[1], now, burst, rate)
+            tokens, retry_after = _take(tokens, burst, rate)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_bucket "
+                "(key, tokens, updated_at, full_at) VALUES (?, ?, ?, ?)",
+                (key, tokens, now, now + (burst - tokens) / rate),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        self._takes += 1
+        if self._takes % self.PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM rate_bucket WHERE full_at < ?", (now,))
+        return retry_after
+
+
+class RateLimiter:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def limited(self, rules):
+        """
+        Rate limit a view. ``rules`` maps a bucket name to a function of
+        the request returning the bucket key (or None to skip it) and the
+        names of its ``burst``/``per_minute`` config settings.
+        """
+
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                if self.backend is None:
+                    return f(*args, **kwargs)
+
+                retry_after = 0
+                for name, (key_func, burst_setting, rate_setting) in rules.items():
+                    key = key_func()
+                    if key is None:
+                        continue
+                    burst = app.config[burst_setting]
+                    rate = app.config[rate_setting] / 60
+                    retry_after = max(
+                        retry_after, self.backend.take(f"{name}:{key}", burst, rate)
+                    )
+
+                if retry_after:
+                    response = jsonify(
+                        {"message": "Too many attempts. Please try again later."}
+                    )
+                    response.status_code = 429
+                    response.headers["Retry-After"] = str(math.ceil(retry_after))
+                    return response
+                return f(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+
+def make_backend(config):
+    backend = config["RATELIMIT_BACKEND"]
+    if backend == "memory":
+        return MemoryBackend(config["RATELIMIT_MAX_ENTRIES"])
+    if backend == "sqlite":
+        return SQLiteBackend(config["RATELIMIT_SQLITE_PATH"])
+    return None
+
+
+def client_ip():
+    # The client's address once ProxyFix has applied X-Forwarded-For; see
+    # PROXY_FIX_HOPS.
+    return request.remote_addr
+
+
+def submitted_username():
+    username = request.form.get("username")
+    return username.strip().lower() if username else None
+
+
+# Applied to login and register.
+AUTH_RULES = {
+    "ip": (client_ip, "RATELIMIT_IP_BURST", "RATELIMIT_IP_PER_MINUTE"),
+    "username": (
+        submitted_username,
+        "RATELIMIT_USERNAME_BURST",
+        "RATELIMIT_USERNAME_PER_MINUTE",
+    ),
+}
+
+rate_limiter = RateLimiter(make_backend(app.config))
@@ -0,0 +1,92 @@
+"""
+Token revocation.
+
+Logging out records the token's ``jti`` claim in the ``revoked_token``
+table with the token's own expiry, so a revocation is seen by every
+worker and is dropped once the token could no longer be used anyway.
+Tokens issued before ``jti`` was added are identified by a hash of the
+token instead.
+
+Checking the table on every request would add a query to each API call,
+so each worker keeps a local copy of the unexpired revocations and
+answers from it, re-reading the table every ``REVOCATION_SYNC_INTERVAL``
+seconds. A logout made on another worker therefore takes at most that
+long to apply here. Expired rows are deleted every
+``REVOCATION_PRUNE_INTERVAL`` seconds.
+"""
+
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, select
+
+from app import app, db
+from app.favourites import DIALECT_INSERTS
+from app.models import RevokedToken, utcnow
+
+
+def token_jti(token, claims):
+    """The token's ``jti`` claim, or a hash of the token if it has none."""
+    return claims.get("jti") or hashlib.sha256(token.encode()).hexdigest()
+
+
+class RevocationStore:
+    def __init__(self, sync_interval, prune_interval):
+        self.sync_interval = sync_interval
+        self.prune_interval = prune_interval
+        self._lock = threading.Lock()
+        self._revoked = {}  # jti -> expires_at
+        self._synced_at = None
+        self._pruned_at = time.monotonic()
+
+    def _sync(self):
+        now = utcnow()
+        with db.engine.connect() as conn:
+            rows = conn.execute(
+                select(RevokedToken.jti, RevokedToken.expires_at).where(
+                    RevokedToken.expires_at > now
+                )
+            ).all()
+        revoked = dict(rows)
+        with self._lock:
+            # Keep local revocations committed after the read above.
+            for jti, expires_at in self._revoked.items():
+                if expires_at > now:
+                    revoked.setdefault(jti, expires_at)
+            self._revoked = revoked
+            self._synced_at = time.monotonic()
+
+        if time.monotonic() - self._pruned_at > self.prune_interval:
+            self.prune()
+
+    def prune(self):
+        """Delete revocations of tokens that have expired."""
+        with db.engine.begin() as conn:
+            conn.execute(delete(RevokedToken).where(RevokedToken.expires_at <= utcnow()))
+        self._pruned_at = time.monotonic()
+
+    def is_revoked(self, jti):
+        synced_at = self._synced_at
+        if synced_at is None or time.monotonic() - synced_at > self.sync_interval:
+            self._sync()
+        return jti in self._revoked
+
+    def revoke(self, jti, exp):
+        """Revoke ``jti`` until ``exp`` (a JWT ``exp`` timestamp)."""
+        expires_at = datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None)
+        dialect = db.session.get_bind().dialect.name
+        db.session.execute(
+            DIALECT_INSERTS[dialect](RevokedToken)
+            .values(jti=jti, expires_at=expires_at)
+            .on_conflict_do_nothing(index_elements=["jti"])
+        )
+        db.session.commit()
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+
+revocations = RevocationStore(
+    app.config["REVOCATION_SYNC_INTERVAL"], app.config["REVOCATION_PRUNE_INTERVAL"]
+)
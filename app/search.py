@@ -0,0 +1,116 @@
+"""
+Indexed substring search over usernames and names.
+
+On PostgreSQL the ``pg_trgm`` GIN indexes on ``lower(username)`` and
+``lower(name)`` let ``LIKE '%term%'`` use an index, and results are ranked
+by trigram similarity. On SQLite the ``user_search`` FTS5 table (trigram
+tokenizer) is searched instead and kept in sync on register. Other
+databases fall back to an unindexed LIKE scan.
+
+Facet counts for the search UI are computed here too.
+"""
+
+from sqlalchemy import Integer, case, column, func, or_, text
+
+from app import db
+from app.models import User, Profile
+
+# The trigram tokenizer can only match terms of at least three characters.
+MIN_FTS_TERM = 3
+
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+
+def _like_pattern(term):
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _contains(term):
+    pattern = _like_pattern(term)
+    return or_(
+        func.lower(User.username).like(pattern, escape="\\"),
+        func.lower(User.name).like(pattern, escape="\\"),
+    )
+
+
+def name_filter(name):
+    """
+    Return ``(condition, relevance)`` matching users whose username or name
+    contains ``name``. Higher relevance means a better match.
+    """
+    term = name.lower()
+    dialect = _dialect()
+
+    if dialect == "postgresql":
+        relevance = func.greatest(
+            func.similarity(func.lower(User.username), term),
+            func.similarity(func.lower(func.coalesce(User.name, "")), term),
+        )
+        return _contains(term), relevance
+
+    username, fullname = func.lower(User.username), func.lower(User.name)
+    relevance = case(
+        (or_(username == term, fullname == term), 3),
+        (
+            or_(
+                username.startswith(term, autoescape=True),
+                fullname.startswith(term, autoescape=True),
+            ),
+            2,
+        ),
+        else_=1,
+    )
+
+    if dialect == "sqlite" and len(term) >= MIN_FTS_TERM:
+        phrase = '"' + term.replace('"', '""') + '"'
+        matches = (
+            text("SELECT rowid FROM user_search WHERE user_search MATCH :phrase")
+            .bindparams(phrase=phrase)
+            .columns(column("rowid", Integer))
+        )
+        return User.id.in_(matches), relevance
+
+    return _contains(term), relevance
+
+
+def index_user(user):
+    """Add a newly registered user to the SQLite search table."""
+    if _dialect() != "sqlite":
+        return
+
+    db.session.flush()
+    db.session.execute(
+        text(
+            "INSERT INTO user_search (rowid, username, name) "
+            "VALUES (:id, :username, :name)"
+        ),
+        {"id": user.id, "username": user.username, "name": user.name},
+    )
+
+
+def facet_counts(query, birth_year_bucket):
+    """
+    Count the profiles selected by ``query`` per sex, race, parish and
+    birth-year bucket, with one grouped aggregate query per facet.
+    """
+    bucket = Profile.birth_year - Profile.birth_year % birth_year_bucket
+    facets = {
+        "sex": Profile.sex,
+        "race": Profile.race,
+        "parish": Profile.parish,
+        "birth_year": bucket,
+    }
+
+    counts = {}
+    for facet, column in facets.items():
+        rows = (
+            query.with_entities(column, func.count(Profile.id))
+            .group_by(column)
+            .order_by(func.count().desc())
+            .all()
+        )
+        counts[facet] = [{"value": value, "count": count} for value, count in rows]
+    return counts
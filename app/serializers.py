@@ -0,0 +1,191 @@
+"""
+Column projections used to serialize listings.
+
+Each projection maps output keys to the columns they come from, so list
+endpoints select just those columns as lightweight row tuples (joined to
+the owning user in the same query) instead of loading full ORM objects
+and building every dict by hand.
+"""
+
+from flask import request
+
+from app import app, db
+from app.formats import response_format
+from app.models import User, Profile
+
+
+class Projection:
+    __slots__ = ("source", "keys", "columns", "iso_keys", "output")
+
+    def __init__(self, columns, iso_keys=(), output=None):
+        self.source = dict(columns)
+        self.keys = list(columns)
+        self.columns = [column.label(key) for key, column in columns.items()]
+        self.iso_keys = [key for key in iso_keys if key in columns]
+        # Keys written by serialize(); the rest are selected for internal
+        # use only, such as pagination sort keys.
+        self.output = set(self.keys if output is None else output)
+
+    def query(self, *extra):
+        """Query selecting the projection columns, followed by ``extra``."""
+        return db.session.query(*self.columns, *extra)
+
+    def serialize(self, row, iso=None):
+        """
+        Dict of the output keys of ``row``. ``iso_keys`` are written as ISO
+        strings unless the response is MessagePack, which encodes datetimes
+        natively; pass ``iso`` to force either way.
+        """
+        data = {
+            key: value for key, value in zip(self.keys, row) if key in self.output
+        }
+        if not self.iso_keys:
+            return data
+        if iso is None:
+            iso = response_format() == "json"
+        if iso:
+            for key in self.iso_keys:
+                if data.get(key) is not None:
+                    data[key] = data[key].isoformat()
+        return data
+
+    def narrow(self, fields, keep=()):
+        """
+        Projection selecting only ``fields`` (plus ``keep``, which is
+        selected but not serialized). Raises ValueError for unknown fields.
+        """
+        unknown = [field for field in fields if field not in self.source]
+        if unknown:
+            raise ValueError("Unknown fields: " + ", ".join(unknown))
+        columns = {
+            key: column
+            for key, column in self.source.items()
+            if key in fields or key in keep
+        }
+        return Projection(columns, self.iso_keys, output=fields)
+
+
+def requested_projection(projection, keep=()):
+    """
+    Narrow ``projection`` to the comma-separated ``?fields=`` of the
+    request, if any. Raises ValueError for unknown fields.
+    """
+    fields = request.args.get("fields")
+    if not fields:
+        return projection
+    fields = [field.strip() for field in fields.split(",") if field.strip()]
+    return projection.narrow(fields, keep)
+
+
+# Same keys as Profile.to_dict().
+PROFILE = Projection(
+    {
+        "id": Profile.id,
+        "user_id": Profile.user_id_fk,
+        "description": Profile.description,
+        "parish": Profile.parish,
+        "biography": Profile.biography,
+        "sex": Profile.sex,
+        "race": Profile.race,
+        "birth_year": Profile.birth_year,
+        "height": Profile.height,
+        "fav_cuisine": Profile.fav_cuisine,
+        "fav_colour": Profile.fav_colour,
+        "fav_school_subject": Profile.fav_school_subject,
+        "political": Profile.political,
+        "religious": Profile.religious,
+        "family_oriented": Profile.family_oriented,
+        "created_at": Profile.created_at,
+    }
+)
+
+# Profile joined with its owner, as returned by the listing endpoints.
+# "fav_school_sibject" is misspelt but the frontend reads it as is.
+PROFILE_LISTING = Projection(
+    {
+        "id": Profile.id,
+        "user_id": Profile.user_id_fk,
+        "description": Profile.description,
+        "parish": Profile.parish,
+        "biography": Profile.biography,
+        "sex": Profile.sex,
+        "race": Profile.race,
+        "birth_year": Profile.birth_year,
+        "height": Profile.height,
+        "fav_cuisine": Profile.fav_cuisine,
+        "fav_colour": Profile.fav_colour,
+        "fav_school_sibject": Profile.fav_school_subject,
+        "political": Profile.political,
+        "religious": Profile.religious,
+        "family_oriented": Profile.family_oriented,
+        "username": User.username,
+        "photo": User.photo,
+        "date_joined": User.date_joined,
+        "profile_created": Profile.created_at,
+    },
+    iso_keys=["date_joined", "profile_created"],
+)
+
+# Same keys as User.to_dict().
+USER = Projection(
+    {
+        "id": User.id,
+        "username": User.username,
+        "email": User.email,
+        "photo": User.photo,
+        "name": User.name,
+        "date_joined": User.date_joined,
+    }
+)
+
+USER_SUMMARY = Projection(
+    {
+        "id": User.id,
+        "username": User.username,
+        "email": User.email,
+        "photo": User.photo,
+    }
+)
+
+
+# Listing order, newest profile first. Backed by the (created_at, id) index.
+NEWEST_FIRST = [(Profile.created_at, True), (Profile.id, True)]
+NEWEST_FIRST_KEYS = ("profile_created", "id")
+
+
+def listing_key(row):
+    """Sort-key values of a PROFILE_LISTING row under NEWEST_FIRST."""
+    return row.profile_created, row.id
+
+
+def profile_listing_query(projection=PROFILE_LISTING):
+    """Profiles joined to their owners, selecting only the listing columns."""
+    return projection.query().join(User, Profile.user_id_fk == User.id)
+
+
+def serialize_match(row):
+    """Serialize a row of ``app.matching``'s stored match query."""
+    data = PROFILE.serialize(row)
+    data["name"] = row.name
+    data["matched_fields"] = row.matched_fields.split(",")
+    data["score"] = row.score
+    return data
+
+
+def stream_json_array(rows, serialize, chunk_size=100):
+    """
+    Encode ``rows`` as a JSON array incrementally, yielding a chunk of text
+    every ``chunk_size`` rows so the whole result never sits in memory.
+    """
+    yield "["
+    chunk = []
+    first = True
+    for row in rows:
+        chunk.append(app.json.dumps(serialize(row)))
+        if len(chunk) == chunk_size:
+            yield ("" if first else ",") + ",".join(chunk)
+            chunk = []
+            first = False
+    if chunk:
+        yield ("" if first else ",") + ",".join(chunk)
+    yield "]"
@@ -21,28 +21,70 @@ from flask import (
     abort,
     send_from_directory,
     jsonify,
+    Response,
+    stream_with_context,
+    g,
 )
 from werkzeug.utils import secure_filename
 from app.models import User, Profile, Favourite
 from app.forms import LoginForm, ProfileForm, RegisterForm
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.matching import refresh_profile_matches, stored_matches, stored_matches_for
+from app.pagination import keyset_query, page_args, paginate
+from app.search import facet_counts, index_user, name_filter
+from app.cache import TTLCache, response_cache
+from app.assets import immutable, index_response
+from app.compression import send_static_file
+from app.favourites import (
+    TRENDING_WINDOWS,
+    add_favourites,
+    mutual_favourites_query,
+    remove_favourites,
+    trending_query,
+)
+from app.revocation import revocations, token_jti
+from app.passwords import hash_password, needs_rehash, verify_password
+from app.ratelimit import AUTH_RULES, rate_limiter
+from app.conditional import (
+    listing_etag,
+    not_modified,
+    profile_etag,
+    user_etag,
+    user_profiles_etag,
+)
+from app.normalize import canonical
+from app.serializers import (
+    NEWEST_FIRST,
+    NEWEST_FIRST_KEYS,
+    PROFILE,
+    PROFILE_LISTING,
+    USER,
+    USER_SUMMARY,
+    listing_key,
+    profile_listing_query,
+    requested_projection,
+    serialize_match,
+    stream_json_array,
+)
 
 from flask_wtf.csrf import generate_csrf
 
-from functools import wraps
+from functools import partial, wraps
+from itertools import groupby, islice
+from operator import attrgetter
 from datetime import datetime, timedelta, timezone
 import jwt
+import time
+import uuid
 from sqlalchemy.exc import SQLAlchemyError
 
 ##Helper Function
 
-blacklisted_tokens = set()
-
 
 def create_token(user_id):  # jwt token
     payload = {
         "user_id": user_id,
         "exp": datetime.now(timezone.utc) + timedelta(hours=6),
+        "jti": uuid.uuid4().hex,
     }
     return jwt.encode(payload, app.config["SECRET_KEY"], algorithm="HS256")
 
@@ -51,6 +93,24 @@ def decode_token(token):  # jwt token
     return jwt.decode(token, app.config["SECRET_KEY"], algorithms=["HS256"])
 
 
+# Claims of recently verified tokens, so repeat requests with the same
+# token skip the signature check. Entries never outlive the token's exp.
+verified_tokens = TTLCache(
+    app.config["AUTH_TOKEN_CACHE_SIZE"], app.config["AUTH_TOKEN_CACHE_TTL"]
+)
+
+
+def verify_token(token):
+    """Decode ``token``, or return its cached claims if verified recently."""
+    claims = verified_tokens.get(token)
+    if claims is None:
+        claims = decode_token(token)
+        ttl = min(claims["exp"] - time.time(), app.config["AUTH_TOKEN_CACHE_TTL"])
+        if ttl > 0:
+            verified_tokens.set(token, claims, ttl)
+    return claims
+
+
 def jwt_required(f):  ##jwt required decorator to attach to the relevant routes
     @wraps(f)
     def wrapper(*args, **kwargs):
@@ -60,23 +120,23 @@ def jwt_required(f):  ##jwt required decorator to attach to the relevant routes
 
         try:
             token = auth_header.split(" ")[1]  # "Bearer <token>"
-
-            # Check if the token is blacklisted
-            if token in blacklisted_tokens:
-                return (
-                    jsonify(
-                        {"message": "Token has been blacklisted. Please log in again."}
-                    ),
-                    401,
-                )
-
-            data = decode_token(token)
+            data = verify_token(token)
             user_id = data["user_id"]
         except jwt.ExpiredSignatureError:
             return jsonify({"message": "Token expired"}), 401
         except Exception as e:
             return jsonify({"message": "Invalid token"}), 401
 
+        # Check if the token has been revoked by a logout
+        if revocations.is_revoked(token_jti(token, data)):
+            return (
+                jsonify({"message": "Token has been blacklisted. Please log in again."}),
+                401,
+            )
+
+        g.user_id = user_id
+        g.token = token
+        g.token_claims = data
         return f(user_id, *args, **kwargs)
 
     return wrapper
@@ -94,19 +154,19 @@ def jwt_required(f):  ##jwt required decorator to attach to the relevant routes
 
 @app.route("/")
 def index():
-    return app.send_static_file("index.html")
+    return index_response()
 
 
 @app.route("/assets/<path:filename>")
 def send_assets(filename):
     """Serve static files from the assets directory."""
-    return app.send_static_file(os.path.join("assets", filename))
+    return immutable(send_static_file(os.path.join("assets", filename)))
 
 
 @app.route("/<path:filename>")
 def send_favicon(filename):
     """Serve static file icon from the static directory."""
-    return app.send_static_file(filename)
+    return send_static_file(filename)
 
 
 ####
@@ -120,6 +180,7 @@ def send_favicon(filename):
 
 
 @app.route("/api/register", methods=["POST"])
+@rate_limiter.limited(AUTH_RULES)
 def register():
     form = RegisterForm()
 
@@ -138,7 +199,9 @@ def register():
             user = User(username, password, name, email, filename)
 
             db.session.add(user)
+            index_user(user)
             db.session.commit()
+            response_cache.invalidate("users")
 
             return (
                 jsonify(
@@ -193,6 +256,7 @@ def get_image(filename):
 
 
 @app.route("/api/auth/login", methods=["POST"])
+@rate_limiter.limited(AUTH_RULES)
 def login():
     form = LoginForm()
 
@@ -203,7 +267,12 @@ def login():
 
         user = User.query.filter_by(username=username).first()
 
-        if user is not None and check_password_hash(user.password, password):
+        if user is not None and verify_password(user.password, password):
+
+            # Upgrade hashes made with older parameters
+            if needs_rehash(user.password):
+                user.password = hash_password(password)
+                db.session.commit()
 
             token = create_token(user.id)
 
@@ -242,54 +311,70 @@ def logout(user_id):
     if not auth_header:
         return jsonify({"message": "Missing token"}), 401
 
-    token = auth_header.split(" ")[1]  # "Bearer <token>"
-
-    # Add the token to the blacklist
-    blacklisted_tokens.add(token)
+    # Revoke the token until it would have expired
+    revocations.revoke(token_jti(g.token, g.token_claims), g.token_claims["exp"])
 
     return jsonify({"message": f"Logout successful for User {user_id}"}), 200
 
 
+def listing_page(query, projection, keys=NEWEST_FIRST, row_key=listing_key, etag=None):
+    """
+    Respond with one page of a profile listing selected with ``projection``,
+    newest first unless other sort keys are given. The cursor for the next page, if any, is returned
+    in the X-Next-Cursor header.
+
+    With ``?stream=1`` every remaining row is streamed instead, read in
+    batches with ``yield_per`` and written out as a JSON array on the fly.
+    """
+    if request.args.get("stream") in ("1", "true"):
+        try:
+            query = keyset_query(query, keys, request.args.get("cursor"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        rows = query.yield_per(app.config["PROFILES_STREAM_BATCH"])
+        # Streamed listings are always JSON.
+        body = stream_json_array(rows, partial(projection.serialize, iso=True))
+        response = Response(stream_with_context(body), mimetype="application/json")
+        if etag:
+            response.set_etag(etag)
+        return response
+
+    try:
+        limit, cursor = page_args(
+            app.config["PROFILES_PAGE_SIZE"], app.config["PROFILES_MAX_PAGE_SIZE"]
+        )
+        results, next_cursor = paginate(query, keys, row_key, limit, cursor)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    profiles_with_user_info = [projection.serialize(row) for row in results]
+
+    response = jsonify(profiles_with_user_info)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if etag:
+        response.set_etag(etag)
+    return response, 200
+
+
 @app.route("/api/profiles", methods=["GET"])
 @csrf.exempt
 @jwt_required
+@response_cache.cached(tags=("profiles", "users"), per_user=True)
 def get_all_profiles(user_id):
+    try:
+        projection = requested_projection(PROFILE_LISTING, keep=NEWEST_FIRST_KEYS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    results = (
-        db.session.query(Profile, User)
-        .join(User, Profile.user_id_fk == User.id)
-        .filter(User.id != user_id)
-        .order_by(Profile.created_at.desc())
-        .all()
-    )
+    etag = listing_etag(user_id)
+    cached = not_modified(etag)
+    if cached:
+        return cached
 
-    profiles_with_user_info = []
-    for profile, user in results:
-        profiles_with_user_info.append(
-            {
-                "id": profile.id,
-                "user_id": user.id,
-                "description": profile.description,
-                "parish": profile.parish,
-                "biography": profile.biography,
-                "sex": profile.sex,
-                "race": profile.race,
-                "birth_year": profile.birth_year,
-                "height": profile.height,
-                "fav_cuisine": profile.fav_cuisine,
-                "fav_colour": profile.fav_colour,
-                "fav_school_sibject": profile.fav_school_subject,
-                "political": profile.political,
-                "religious": profile.religious,
-                "family_oriented": profile.family_oriented,
-                "username": user.username,
-                "photo": user.photo,
-                "date_joined": user.date_joined.isoformat(),
-                "profile_created": profile.created_at.isoformat(),
-            }
-        )
+    query = profile_listing_query(projection).filter(User.id != user_id)
 
-    return jsonify(profiles_with_user_info), 200
+    return listing_page(query, projection, etag=etag)
 
 
 @app.route("/api/profiles", methods=["POST"])
@@ -338,7 +423,9 @@ def create_profile():
         )
 
         db.session.add(profile)
+        refresh_profile_matches(profile)
         db.session.commit()
+        response_cache.invalidate("profiles")
 
         return (
             jsonify(
@@ -366,41 +453,28 @@ def create_profile():
 @jwt_required
 def get_profile(user_id, profile_id):
     print("get_profile route was reached")
-    result = (
-        db.session.query(Profile, User)
-        .join(User, Profile.user_id_fk == User.id)
-        .filter(Profile.id == profile_id)
-        .first()
-    )
+    try:
+        projection = requested_projection(PROFILE_LISTING)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    etag = profile_etag(profile_id)
+    if etag is None:
+        return jsonify({"message": "Profile not found."}), 404
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    result = profile_listing_query(projection).filter(Profile.id == profile_id).first()
 
     if not result:
         return jsonify({"message": "Profile not found."}), 404
 
-    profile, user = result
-
-    profile_data = {
-        "id": profile.id,
-        "user_id": user.id,
-        "description": profile.description,
-        "parish": profile.parish,
-        "biography": profile.biography,
-        "sex": profile.sex,
-        "race": profile.race,
-        "birth_year": profile.birth_year,
-        "height": profile.height,
-        "fav_cuisine": profile.fav_cuisine,
-        "fav_colour": profile.fav_colour,
-        "fav_school_sibject": profile.fav_school_subject,
-        "political": profile.political,
-        "religious": profile.religious,
-        "family_oriented": profile.family_oriented,
-        "username": user.username,
-        "photo": user.photo,
-        "date_joined": user.date_joined.isoformat(),
-        "profile_created": profile.created_at.isoformat(),
-    }
+    profile_data = projection.serialize(result)
 
-    return jsonify(profile_data), 200
+    response = jsonify(profile_data)
+    response.set_etag(etag)
+    return response, 200
 
 
 # Add user to favourites
@@ -412,18 +486,52 @@ def favourite_user(user_id, user_id2):
     if current_user_id == user_id2:
         return jsonify({"error": "You can't favourite yourself."}), 400
 
-    already_fav = Favourite.query.filter_by(
-        user_id_fk=current_user_id, fav_user_id_fk=user_id2
-    ).first()
-    if already_fav:
+    added = add_favourites(current_user_id, [user_id2])
+    db.session.commit()
+    if not added:
+        if db.session.get(User, user_id2) is None:
+            return jsonify({"error": "User not found"}), 404
         return jsonify({"message": "User is already in favourites."}), 200
 
-    fav = Favourite(user_id_fk=current_user_id, fav_user_id_fk=user_id2)
-    db.session.add(fav)
-    db.session.commit()
+    response_cache.invalidate("favourites")
     return jsonify({"message": "User added to favourites"}), 201
 
 
+@app.route("/api/favourites/bulk", methods=["POST"])
+@csrf.exempt
+@jwt_required
+def bulk_favourites(user_id):
+    """
+    Add and remove many favourites in one transaction. Expects JSON of the
+    form {"add": [user ids], "remove": [user ids]}; either may be omitted.
+    """
+    data = request.get_json(silent=True) or {}
+    max_ids = app.config["FAVOURITES_BULK_MAX_IDS"]
+    ids = {}
+    for key in ("add", "remove"):
+        value = data.get(key, [])
+        if not isinstance(value, list) or not all(
+            isinstance(uid, int) for uid in value
+        ):
+            return jsonify({"error": f"{key} must be a list of integers"}), 400
+        if len(value) > max_ids:
+            return jsonify({"error": f"At most {max_ids} ids in {key}"}), 400
+        ids[key] = value
+
+    if set(ids["add"]) & set(ids["remove"]):
+        return jsonify({"error": "The same user can't be added and removed"}), 400
+
+    added = add_favourites(user_id, ids["add"])
+    removed = remove_favourites(user_id, ids["remove"])
+    db.session.commit()
+    if added or removed:
+        response_cache.invalidate("favourites")
+    if removed:
+        # Removals come straight out of the trending buckets.
+        response_cache.invalidate("trending")
+    return jsonify({"added": added, "removed": removed}), 200
+
+
 # UPDATE PROFILE
 @app.route("/api/profiles/<int:profile_id>", methods=["PUT"])
 @csrf.exempt
@@ -453,7 +561,22 @@ def update_profile(user_id, profile_id):
         if field in data:
             setattr(profile, field, data[field])
 
+    # The edit form sends every field as text; matching needs numbers.
+    for field, convert in (("birth_year", int), ("height", float)):
+        value = data.get(field)
+        if value is None or value == "":
+            if field in data:
+                setattr(profile, field, None)
+            continue
+        try:
+            setattr(profile, field, convert(str(value).strip()))
+        except ValueError:
+            db.session.rollback()
+            return jsonify({"error": f"{field} must be a number"}), 400
+
+    refresh_profile_matches(profile)
     db.session.commit()
+    response_cache.invalidate("profiles")
     return jsonify({"message": "Profile updated", "profile": profile.to_dict()}), 200
 
 
@@ -466,160 +589,235 @@ def match_profiles(user_id, profile_id):
     if not current:
         return jsonify({"error": "Profile not found"}), 404
 
-    matches = []
-    all_profiles = Profile.query.filter(
-        Profile.id != profile_id, Profile.user_id_fk != user_id
-    ).all()
+    try:
+        limit, cursor = page_args(
+            app.config["MATCHES_PAGE_SIZE"], app.config["MATCHES_MAX_PAGE_SIZE"]
+        )
+        page, next_cursor = stored_matches(profile_id, limit, cursor)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    match_fields = [
-        "fav_cuisine",
-        "fav_colour",
-        "fav_school_subject",
-        "political",
-        "religious",
-        "family_oriented",
-    ]
+    matches = [serialize_match(row) for row in page]
 
-    for profile in all_profiles:
-        if not profile.birth_year or not current.birth_year:
-            continue
-        if abs(profile.birth_year - current.birth_year) > 5:
-            continue
+    response = jsonify(matches)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response, 200
 
-        if not profile.height or not current.height:
-            continue
-        height_diff_inches = abs(profile.height - current.height) * 39.37
-        if not (3 <= int(height_diff_inches) <= 10):
-            continue
 
-        matched_fields = [
-            field
-            for field in match_fields
-            if getattr(profile, field) == getattr(current, field)
-        ]
-        if len(matched_fields) < 3:
-            continue
+@app.route("/api/profiles/matches", methods=["POST"])
+@csrf.exempt
+@jwt_required
+def batch_match_profiles(user_id):
+    """
+    Return matches for many profiles at once. Expects JSON of the form
+    {"profile_ids": [1, 2, ...], "limit": 20} and streams one JSON line per
+    profile holding its best ``limit`` matches.
+    """
+    data = request.get_json(silent=True) or {}
+    profile_ids = data.get("profile_ids")
+    if not isinstance(profile_ids, list) or not all(
+        isinstance(pid, int) for pid in profile_ids
+    ):
+        return jsonify({"error": "profile_ids must be a list of integers"}), 400
+
+    max_ids = app.config["MATCH_BATCH_MAX_IDS"]
+    if len(profile_ids) > max_ids:
+        return jsonify({"error": f"At most {max_ids} profile_ids per request"}), 400
+
+    limit = data.get("limit", app.config["MATCHES_PAGE_SIZE"])
+    if not isinstance(limit, int) or limit < 1:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    limit = min(limit, app.config["MATCHES_MAX_PAGE_SIZE"])
+
+    owned_ids = {
+        pid
+        for (pid,) in db.session.query(Profile.id).filter(
+            Profile.id.in_(profile_ids), Profile.user_id_fk == user_id
+        )
+    }
 
-        profile_dict = profile.to_dict()
+    def generate():
+        for pid in sorted(set(profile_ids) - owned_ids):
+            yield app.json.dumps({"profile_id": pid, "error": "Profile not found"}) + "\n"
 
-        owner = User.query.get(profile.user_id_fk)
-        profile_dict["name"] = owner.name if owner else None
+        grouped = groupby(stored_matches_for(owned_ids), key=attrgetter("profile_a"))
+        current = next(grouped, None)
+        for pid in sorted(owned_ids):
+            matches = []
+            if current is not None and current[0] == pid:
+                matches = [serialize_match(row) for row in islice(current[1], limit)]
+                current = next(grouped, None)
+            yield app.json.dumps({"profile_id": pid, "matches": matches}) + "\n"
 
-        profile_dict["matched_fields"] = matched_fields
-        matches.append(profile_dict)
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
 
-    return jsonify(matches), 200
 
-@app.route("/api/search", methods=["GET"])
-@csrf.exempt
-@jwt_required
-def search_profiles(user_id):
+def search_query(query, user_id):
+    """Apply the /api/search filters in the request args to ``query``."""
     name = request.args.get("name")
     birth_year = request.args.get("birth_year")
     sex = request.args.get("sex")
     race = request.args.get("race")
 
-    query = (
-        db.session.query(Profile, User)
-        .join(User, Profile.user_id_fk == User.id)
-        .filter(User.id != user_id)
-    )
+    query = query.filter(User.id != user_id)
 
     if name:
-        query = query.filter(func.lower(User.username).like(f"%{name.lower()}%"))
+        condition, _relevance = name_filter(name)
+        query = query.filter(condition)
     if birth_year:
         query = query.filter(Profile.birth_year == int(birth_year))
     if sex:
-        query = query.filter(func.lower(Profile.sex) == sex.lower())
+        query = query.filter(Profile.sex == canonical("sex", sex))
     if race:
-        query = query.filter(func.lower(Profile.race) == race.lower())
+        query = query.filter(Profile.race == canonical("race", race))
 
-    results = query.order_by(Profile.created_at.desc()).all()
+    return query
 
-    profiles_with_user_info = []
-    for profile, user in results:
-        profiles_with_user_info.append(
-            {
-                "id": profile.id,
-                "user_id": user.id,
-                "description": profile.description,
-                "parish": profile.parish,
-                "biography": profile.biography,
-                "sex": profile.sex,
-                "race": profile.race,
-                "birth_year": profile.birth_year,
-                "height": profile.height,
-                "fav_cuisine": profile.fav_cuisine,
-                "fav_colour": profile.fav_colour,
-                "fav_school_sibject": profile.fav_school_subject,
-                "political": profile.political,
-                "religious": profile.religious,
-                "family_oriented": profile.family_oriented,
-                "username": user.username,
-                "photo": user.photo,
-                "date_joined": user.date_joined.isoformat(),
-                "profile_created": profile.created_at.isoformat(),
-            }
+
+@app.route("/api/search", methods=["GET"])
+@csrf.exempt
+@jwt_required
+@response_cache.cached(tags=("profiles", "users"), per_user=True)
+def search_profiles(user_id):
+    try:
+        projection = requested_projection(PROFILE_LISTING, keep=NEWEST_FIRST_KEYS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    etag = listing_etag(user_id)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    name = request.args.get("name")
+
+    query = search_query(profile_listing_query(projection), user_id)
+
+    if name:
+        # Rank by relevance to the name, newest first among equals.
+        _condition, relevance = name_filter(name)
+        query = query.add_columns(relevance.label("relevance"))
+        return listing_page(
+            query,
+            projection,
+            [(relevance, True)] + NEWEST_FIRST,
+            lambda row: (row.relevance, *listing_key(row)),
+            etag=etag,
         )
 
-    return jsonify(profiles_with_user_info), 200
+    return listing_page(query, projection, etag=etag)
+
+@app.route("/api/search/facets", methods=["GET"])
+@csrf.exempt
+@jwt_required
+@response_cache.cached(
+    tags=("profiles", "users"), ttl=app.config["FACET_CACHE_TTL"], per_user=True
+)
+def search_facets(user_id):
+    """Profile counts per sex, race, parish and birth-year bucket."""
+    query = search_query(profile_listing_query(), user_id)
+    counts = facet_counts(query, app.config["FACET_BIRTH_YEAR_BUCKET"])
+    return jsonify(counts), 200
+
 
 @app.route("/api/users/<int:user_id2>", methods=["GET"])
 @csrf.exempt
 @jwt_required
 def get_user(user_id, user_id2):
-    user = db.session.get(User, user_id2)
+    try:
+        projection = requested_projection(USER)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    etag = user_etag(user_id2)
+    if etag is None:
+        return jsonify({"error": "User not found"}), 404
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    user = projection.query().filter(User.id == user_id2).first()
     if user:
-        return jsonify(user.to_dict()), 200
+        response = jsonify(projection.serialize(user))
+        response.set_etag(etag)
+        return response, 200
     return jsonify({"error": "User not found"}), 404
 
 @app.route("/api/users/<int:user_id2>/favourites", methods=["GET"])
 @csrf.exempt
 @jwt_required
 def user_favourites(user_id, user_id2):
-    favs = Favourite.query.filter_by(user_id_fk=user_id2).all()
-    data = []
-    for fav in favs:
-        user = db.session.get(User, fav.fav_user_id_fk)
-        if user:
-            data.append(
-                {
-                    "id": user.id,
-                    "username": user.username,
-                    "email": user.email,
-                    "photo": user.photo,
-                }
-            )
+    favs = (
+        USER_SUMMARY.query()
+        .join(Favourite, Favourite.fav_user_id_fk == User.id)
+        .filter(Favourite.user_id_fk == user_id2)
+        .all()
+    )
+    data = [USER_SUMMARY.serialize(row) for row in favs]
     return jsonify(data), 200
 
 
+@app.route("/api/users/<int:user_id2>/mutual-favourites", methods=["GET"])
+@csrf.exempt
+@jwt_required
+@response_cache.cached(tags=("favourites", "users"))
+def mutual_favourites(user_id, user_id2):
+    """Users that ``user_id2`` favourited who also favourited them back."""
+    rows = mutual_favourites_query(user_id2, USER_SUMMARY).all()
+    return jsonify([USER_SUMMARY.serialize(row) for row in rows]), 200
+
+
 @app.route("/api/users/favourites/<int:N>", methods=["GET"])
 @csrf.exempt
 @jwt_required
+@response_cache.cached(tags=("favourites", "users"))
 def top_favourited_users(user_id, N):
+    # Walks the (favourite_count, id) index from the top.
     counts = (
-        db.session.query(
-            Favourite.fav_user_id_fk,
-            func.count(Favourite.fav_user_id_fk).label("count"),
-        )
-        .group_by(Favourite.fav_user_id_fk)
-        .order_by(func.count(Favourite.fav_user_id_fk).desc())
+        USER_SUMMARY.query(User.favourite_count)
+        .filter(User.favourite_count > 0)
+        .order_by(User.favourite_count.desc(), User.id.desc())
         .limit(N)
         .all()
     )
 
     result = []
-    for user_id, count in counts:
-        user = db.session.get(User, user_id)
-        if user:
-            udata = {
-                "id": user.id,
-                "username": user.username,
-                "email": user.email,
-                "photo": user.photo,
-                "favourite_count": count,
-            }
-            result.append(udata)
+    for row in counts:
+        udata = USER_SUMMARY.serialize(row)
+        udata["favourite_count"] = row.favourite_count
+        result.append(udata)
+
+    return jsonify(result), 200
+
+
+@app.route("/api/users/trending", methods=["GET"])
+@csrf.exempt
+@jwt_required
+@response_cache.cached(
+    tags=("trending", "users"), ttl=app.config["TRENDING_CACHE_TTL"]
+)
+def trending_users(user_id):
+    """
+    Most favourited users over ``?window=`` (24h, 7d or 30d), from the
+    hourly counts kept by ``flask rollup-favourites``.
+    """
+    window = request.args.get("window", "24h")
+    if window not in TRENDING_WINDOWS:
+        windows = ", ".join(TRENDING_WINDOWS)
+        return jsonify({"error": f"window must be one of {windows}"}), 400
+    try:
+        limit, _ = page_args(
+            app.config["TRENDING_PAGE_SIZE"], app.config["TRENDING_MAX_PAGE_SIZE"]
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    result = []
+    for row in trending_query(window, USER_SUMMARY).limit(limit):
+        udata = USER_SUMMARY.serialize(row)
+        udata["favourite_count"] = row.favourite_count
+        result.append(udata)
 
     return jsonify(result), 200
 
@@ -628,13 +826,25 @@ def top_favourited_users(user_id, N):
 @csrf.exempt
 @jwt_required
 def get_user_profiles(current_user_id, user_id):
-    profiles = Profile.query.filter_by(user_id_fk=user_id).all()
+    try:
+        projection = requested_projection(PROFILE)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    etag = user_profiles_etag(user_id)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    profiles = projection.query().filter(Profile.user_id_fk == user_id).all()
 
     if not profiles:
         return jsonify({"message": "No profiles found for this user."}), 404
 
-    profiles_data = [profile.to_dict() for profile in profiles]
-    return jsonify(profiles_data), 200
+    profiles_data = [projection.serialize(row) for row in profiles]
+    response = jsonify(profiles_data)
+    response.set_etag(etag)
+    return response, 200
 
 # The functions below should be applicable to all Flask apps.
 
@@ -657,7 +867,7 @@ def form_errors(form):
 def send_text_file(file_name):
     """Send your static text file."""
     file_dot_text = file_name + ".txt"
-    return app.send_static_file(file_dot_text)
+    return send_static_file(file_dot_text)
 
 
 @app.after_request
@@ -666,9 +876,11 @@ def add_header(response):
     Add headers to both force latest IE rendering engine or Chrome Frame,
     and also tell the browser not to cache the rendered page. If we wanted
     to we could change max-age to 600 seconds which would be 10 minutes.
+    Fingerprinted assets keep their immutable caching.
     """
     response.headers["X-UA-Compatible"] = "IE=Edge,chrome=1"
-    response.headers["Cache-Control"] = "public, max-age=0"
+    if not response.cache_control.immutable:
+        response.headers["Cache-Control"] = "public, max-age=0"
     return response
 
 
@@ -0,0 +1,37 @@
+"""remove duplicate favourites and make (user, favourite user) unique
+
+Revision ID: 2b7d4f9a6c15
+Revises: 1a6c9e2d4b83
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b7d4f9a6c15'
+down_revision = '1a6c9e2d4b83'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep the oldest row of each duplicated pair.
+    favourite = sa.table(
+        'favourite', sa.column('id'), sa.column('user_id_fk'), sa.column('fav_user_id_fk')
+    )
+    keep = sa.select(sa.func.min(favourite.c.id)).group_by(
+        favourite.c.user_id_fk, favourite.c.fav_user_id_fk
+    )
+    op.execute(favourite.delete().where(favourite.c.id.not_in(keep)))
+
+    with op.batch_alter_table('favourite', schema=None) as batch_op:
+        batch_op.create_unique_constraint(
+            'uq_favourite_user_id_fk_fav_user_id_fk', ['user_id_fk', 'fav_user_id_fk']
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('favourite', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_favourite_user_id_fk_fav_user_id_fk', type_='unique')
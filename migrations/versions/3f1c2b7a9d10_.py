@@ -0,0 +1,26 @@
+"""add composite index for profile matching
+
+Revision ID: 3f1c2b7a9d10
+Revises: 2dc8a1343b08
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2b7a9d10'
+down_revision = '2dc8a1343b08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('profile', schema=None) as batch_op:
+        batch_op.create_index('ix_profile_birth_year_height', ['birth_year', 'height'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('profile', schema=None) as batch_op:
+        batch_op.drop_index('ix_profile_birth_year_height')
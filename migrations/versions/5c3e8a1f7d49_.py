@@ -0,0 +1,39 @@
+"""add a denormalized favourite count to users
+
+Revision ID: 5c3e8a1f7d49
+Revises: 2b7d4f9a6c15
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c3e8a1f7d49'
+down_revision = '2b7d4f9a6c15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('favourite_count', sa.Integer(), server_default='0', nullable=False))
+
+    users = sa.table('users', sa.column('id'), sa.column('favourite_count'))
+    favourite = sa.table('favourite', sa.column('fav_user_id_fk'))
+    count = (
+        sa.select(sa.func.count())
+        .where(favourite.c.fav_user_id_fk == users.c.id)
+        .scalar_subquery()
+    )
+    op.execute(users.update().values(favourite_count=count))
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('ix_users_favourite_count_id', ['favourite_count', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_favourite_count_id')
+        batch_op.drop_column('favourite_count')
@@ -0,0 +1,40 @@
+"""add favourite timestamps and hourly favourite counts
+
+Revision ID: 7e1b4c9d2a60
+Revises: 5c3e8a1f7d49
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e1b4c9d2a60'
+down_revision = '5c3e8a1f7d49'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing favourites keep a NULL timestamp; when they were made is
+    # unknown, so they never count as trending.
+    with op.batch_alter_table('favourite', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_favourite_created_at', ['created_at'], unique=False)
+
+    op.create_table('favourite_hourly',
+    sa.Column('hour', sa.DateTime(), nullable=False),
+    sa.Column('fav_user_id_fk', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['fav_user_id_fk'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('hour', 'fav_user_id_fk')
+    )
+
+
+def downgrade():
+    op.drop_table('favourite_hourly')
+
+    with op.batch_alter_table('favourite', schema=None) as batch_op:
+        batch_op.drop_index('ix_favourite_created_at')
+        batch_op.drop_column('created_at')
@@ -0,0 +1,33 @@
+"""add profile_match table
+
+Revision ID: 8b2e4d6c1a57
+Revises: 3f1c2b7a9d10
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e4d6c1a57'
+down_revision = '3f1c2b7a9d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('profile_match',
+    sa.Column('profile_a', sa.Integer(), nullable=False),
+    sa.Column('profile_b', sa.Integer(), nullable=False),
+    sa.Column('matched_fields', sa.String(length=120), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['profile_a'], ['profile.id'], ),
+    sa.ForeignKeyConstraint(['profile_b'], ['profile.id'], ),
+    sa.PrimaryKeyConstraint('profile_a', 'profile_b')
+    )
+    # Populate the table afterwards with `flask rebuild-matches`.
+
+
+def downgrade():
+    op.drop_table('profile_match')
@@ -0,0 +1,27 @@
+"""index favourites by favourited user
+
+Revision ID: 9d4f2a7b3e18
+Revises: 7e1b4c9d2a60
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4f2a7b3e18'
+down_revision = '7e1b4c9d2a60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # (user_id_fk, fav_user_id_fk) is already indexed by its unique constraint.
+    with op.batch_alter_table('favourite', schema=None) as batch_op:
+        batch_op.create_index('ix_favourite_fav_user_id_fk_user_id_fk', ['fav_user_id_fk', 'user_id_fk'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('favourite', schema=None) as batch_op:
+        batch_op.drop_index('ix_favourite_fav_user_id_fk_user_id_fk')
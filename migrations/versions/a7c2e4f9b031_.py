@@ -0,0 +1,47 @@
+"""make profile.created_at not null
+
+Revision ID: a7c2e4f9b031
+Revises: e3b9c5d1f086
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c2e4f9b031'
+down_revision = 'e3b9c5d1f086'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # created_at is a keyset pagination key, which cannot be NULL.
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    profile = sa.table(
+        'profile', sa.column('created_at', sa.DateTime), sa.column('updated_at', sa.DateTime)
+    )
+    op.execute(
+        profile.update()
+        .where(profile.c.created_at.is_(None))
+        .values(
+            created_at=sa.func.coalesce(
+                profile.c.updated_at, sa.literal(now, sa.DateTime())
+            )
+        )
+    )
+
+    with op.batch_alter_table('profile', schema=None) as batch_op:
+        batch_op.alter_column('created_at',
+               existing_type=sa.DateTime(),
+               nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('profile', schema=None) as batch_op:
+        batch_op.alter_column('created_at',
+               existing_type=sa.DateTime(),
+               nullable=True)
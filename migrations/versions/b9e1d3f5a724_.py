@@ -0,0 +1,50 @@
+"""collapse whitespace left in categorical profile columns
+
+Revision ID: b9e1d3f5a724
+Revises: a7c2e4f9b031
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9e1d3f5a724'
+down_revision = 'a7c2e4f9b031'
+branch_labels = None
+depends_on = None
+
+# Snapshot of app.normalize.NORMALIZED_FIELDS.
+NORMALIZED_FIELDS = (
+    'sex',
+    'race',
+    'parish',
+    'fav_cuisine',
+    'fav_colour',
+    'fav_school_subject',
+)
+
+
+def upgrade():
+    # Databases normalized by an earlier version of f0a3d5e8b614 kept
+    # internal runs of whitespace ("st.  ann"), which canonical() collapses.
+    profile = sa.table(
+        'profile', sa.column('id'), *(sa.column(field) for field in NORMALIZED_FIELDS)
+    )
+    conn = op.get_bind()
+    for row in conn.execute(sa.select(profile)).mappings().all():
+        changes = {}
+        for field in NORMALIZED_FIELDS:
+            value = row[field]
+            if value is not None and ' '.join(value.split()) != value:
+                changes[field] = ' '.join(value.split())
+        if changes:
+            conn.execute(profile.update().where(profile.c.id == row['id']).values(changes))
+
+    # Collapsed values can change which profiles match; refresh the stored
+    # matches with `flask rebuild-matches`.
+
+
+def downgrade():
+    pass
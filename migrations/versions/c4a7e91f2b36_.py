@@ -0,0 +1,28 @@
+"""index profile_match by score for ranked lookups
+
+Revision ID: c4a7e91f2b36
+Revises: 8b2e4d6c1a57
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a7e91f2b36'
+down_revision = '8b2e4d6c1a57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('profile_match', schema=None) as batch_op:
+        batch_op.create_index('ix_profile_match_profile_a_score', ['profile_a', 'score'], unique=False)
+    # Scores now include age and height closeness; refresh stored rows
+    # with `flask rebuild-matches`.
+
+
+def downgrade():
+    with op.batch_alter_table('profile_match', schema=None) as batch_op:
+        batch_op.drop_index('ix_profile_match_profile_a_score')
@@ -0,0 +1,35 @@
+"""store profile.created_at with microseconds on SQLite
+
+Revision ID: d1f7a3c9e265
+Revises: c8e2f6a1b574
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1f7a3c9e265'
+down_revision = 'c8e2f6a1b574'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rows stamped by CURRENT_TIMESTAMP are stored as 'YYYY-MM-DD HH:MM:SS'.
+    # Keyset cursors bind 'YYYY-MM-DD HH:MM:SS.ffffff', which SQLite
+    # compares as text, so pad the old values to the same format.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    profile = sa.table('profile', sa.column('created_at', sa.String))
+    op.execute(
+        profile.update()
+        .where(profile.c.created_at.is_not(None))
+        .where(sa.func.length(profile.c.created_at) == 19)
+        .values(created_at=profile.c.created_at + '.000000')
+    )
+
+
+def downgrade():
+    pass
@@ -0,0 +1,26 @@
+"""index profile by (created_at, id) for keyset pagination
+
+Revision ID: d92f0b3e5c81
+Revises: c4a7e91f2b36
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd92f0b3e5c81'
+down_revision = 'c4a7e91f2b36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('profile', schema=None) as batch_op:
+        batch_op.create_index('ix_profile_created_at_id', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('profile', schema=None) as batch_op:
+        batch_op.drop_index('ix_profile_created_at_id')
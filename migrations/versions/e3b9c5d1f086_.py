@@ -0,0 +1,50 @@
+"""add indexed updated_at to users and profile for listing ETags
+
+Revision ID: e3b9c5d1f086
+Revises: d1f7a3c9e265
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b9c5d1f086'
+down_revision = 'd1f7a3c9e265'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+    with op.batch_alter_table('profile', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    users = sa.table('users', sa.column('date_joined'), sa.column('updated_at'))
+    op.execute(
+        users.update().values(
+            updated_at=sa.func.coalesce(users.c.date_joined, sa.func.current_timestamp())
+        )
+    )
+    profile = sa.table('profile', sa.column('created_at'), sa.column('updated_at'))
+    op.execute(
+        profile.update().values(
+            updated_at=sa.func.coalesce(profile.c.created_at, sa.func.current_timestamp())
+        )
+    )
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('ix_users_updated_at', ['updated_at'], unique=False)
+    with op.batch_alter_table('profile', schema=None) as batch_op:
+        batch_op.create_index('ix_profile_updated_at', ['updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('profile', schema=None) as batch_op:
+        batch_op.drop_index('ix_profile_updated_at')
+        batch_op.drop_column('updated_at')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_updated_at')
+        batch_op.drop_column('updated_at')
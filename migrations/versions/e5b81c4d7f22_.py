@@ -0,0 +1,36 @@
+"""indexed substring search on users.username and users.name
+
+Revision ID: e5b81c4d7f22
+Revises: d92f0b3e5c81
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b81c4d7f22'
+down_revision = 'd92f0b3e5c81'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute('CREATE INDEX ix_users_username_trgm ON users USING gin (lower(username) gin_trgm_ops)')
+        op.execute('CREATE INDEX ix_users_name_trgm ON users USING gin (lower(name) gin_trgm_ops)')
+    elif dialect == 'sqlite':
+        op.execute("CREATE VIRTUAL TABLE user_search USING fts5(username, name, tokenize='trigram')")
+        op.execute('INSERT INTO user_search (rowid, username, name) SELECT id, username, name FROM users')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('DROP INDEX ix_users_name_trgm')
+        op.execute('DROP INDEX ix_users_username_trgm')
+    elif dialect == 'sqlite':
+        op.execute('DROP TABLE user_search')
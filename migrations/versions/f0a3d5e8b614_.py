@@ -0,0 +1,81 @@
+"""normalize categorical profile columns and index them
+
+Revision ID: f0a3d5e8b614
+Revises: e5b81c4d7f22
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f0a3d5e8b614'
+down_revision = 'e5b81c4d7f22'
+branch_labels = None
+depends_on = None
+
+# Snapshot of app.normalize at the time of this migration.
+NORMALIZED_FIELDS = (
+    'sex',
+    'race',
+    'parish',
+    'fav_cuisine',
+    'fav_colour',
+    'fav_school_subject',
+)
+
+ALIASES = {
+    'sex': {'m': 'male', 'man': 'male', 'f': 'female', 'woman': 'female'},
+    'fav_colour': {'gray': 'grey'},
+}
+
+
+SAINT_PREFIXES = ('saint ', 'st ')
+
+
+def canonical(field, value):
+    if value is None:
+        return None
+    value = ' '.join(str(value).split()).lower()
+    if not value:
+        return None
+    if field == 'parish':
+        for prefix in SAINT_PREFIXES:
+            if value.startswith(prefix):
+                value = 'st. ' + value[len(prefix):]
+                break
+    return ALIASES.get(field, {}).get(value, value)
+
+
+def upgrade():
+    # Normalized in Python so stored values match app.normalize.canonical
+    # exactly, including collapsed runs of whitespace.
+    profile = sa.table(
+        'profile', sa.column('id'), *(sa.column(field) for field in NORMALIZED_FIELDS)
+    )
+    conn = op.get_bind()
+    for row in conn.execute(sa.select(profile)).mappings().all():
+        changes = {}
+        for field in NORMALIZED_FIELDS:
+            value = canonical(field, row[field])
+            if value != row[field]:
+                changes[field] = value
+        if changes:
+            conn.execute(profile.update().where(profile.c.id == row['id']).values(changes))
+
+    with op.batch_alter_table('profile', schema=None) as batch_op:
+        batch_op.create_index('ix_profile_sex', ['sex'], unique=False)
+        batch_op.create_index('ix_profile_race', ['race'], unique=False)
+        batch_op.create_index('ix_profile_parish', ['parish'], unique=False)
+
+    # Normalized values can change which profiles match; refresh the
+    # stored matches with `flask rebuild-matches`.
+
+
+def downgrade():
+    # The original spellings are not kept, so only the indexes are undone.
+    with op.batch_alter_table('profile', schema=None) as batch_op:
+        batch_op.drop_index('ix_profile_parish')
+        batch_op.drop_index('ix_profile_race')
+        batch_op.drop_index('ix_profile_sex')
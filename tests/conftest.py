@@ -0,0 +1,27 @@
+import os
+import tempfile
+
+import pytest
+
+_tmp = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(_tmp, "test.db"))
+os.environ.setdefault("UPLOAD_FOLDER", os.path.join(_tmp, "uploads"))
+os.environ.setdefault("CACHE_BACKEND", "none")
+os.environ.setdefault("RATELIMIT_BACKEND", "none")
+
+from app import app as flask_app, db  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    flask_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
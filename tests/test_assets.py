@@ -0,0 +1,16 @@
+from app.assets import _preload_links
+
+
+def test_preload_links_with_chunks_importing_each_other():
+    manifest = {
+        "index.html": {"file": "assets/index.js", "isEntry": True, "imports": ["_a.js"]},
+        "_a.js": {"file": "assets/a.js", "imports": ["_b.js"], "css": ["assets/a.css"]},
+        "_b.js": {"file": "assets/b.js", "imports": ["_a.js"]},
+    }
+
+    assert _preload_links(manifest) == [
+        "</assets/index.js>; rel=modulepreload",
+        "</assets/a.js>; rel=modulepreload",
+        "</assets/a.css>; rel=preload; as=style",
+        "</assets/b.js>; rel=modulepreload",
+    ]
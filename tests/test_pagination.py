@@ -0,0 +1,77 @@
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app import db
+from app.models import Profile, User
+from app.pagination import encode_cursor
+from app.views import create_token
+
+
+def make_user(username):
+    user = User(username, "pw", username.title(), f"{username}@example.com", "")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def make_profile(user, **kwargs):
+    profile = Profile(user.id)
+    for name, value in kwargs.items():
+        setattr(profile, name, value)
+    db.session.add(profile)
+    db.session.commit()
+    return profile
+
+
+def walk(client, url, headers):
+    ids, cursor = [], None
+    while True:
+        page_url = f"{url}&cursor={cursor}" if cursor else url
+        response = client.get(page_url, headers=headers)
+        assert response.status_code == 200
+        page = [row["id"] for row in response.get_json()]
+        assert page, "empty page with a next cursor"
+        ids += page
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return ids
+        assert len(ids) <= 10, "cursor does not advance"
+
+
+def test_pages_through_profiles_created_in_the_same_second(client):
+    viewer = make_user("viewer")
+    headers = {"Authorization": f"Bearer {create_token(viewer.id)}"}
+    created_at = datetime(2026, 10, 18, 18, 14, 12)
+    ids = [
+        make_profile(make_user(f"user{i}"), created_at=created_at).id for i in range(4)
+    ]
+
+    assert walk(client, "/api/profiles?limit=1", headers) == sorted(ids, reverse=True)
+
+
+def test_created_at_is_stored_with_microseconds(client):
+    make_profile(make_user("owner"))
+
+    stored = db.session.execute(text("SELECT created_at FROM profile")).scalar()
+    assert len(stored) == len("2026-10-18 18:14:12.000000")
+
+
+def test_rejects_malformed_cursors(client):
+    viewer = make_user("viewer")
+    headers = {"Authorization": f"Bearer {create_token(viewer.id)}"}
+    make_profile(make_user("owner"))
+
+    for values in (
+        [123, 1],
+        [None, 1],
+        ["2026-10-18T18:14:12", None],
+        ["2026-10-18T18:14:12", {"id": 1}],
+        ["2026-10-18T18:14:12", 2**64],
+        ["yesterday", 1],
+    ):
+        response = client.get(
+            f"/api/profiles?cursor={encode_cursor(values)}", headers=headers
+        )
+        assert response.status_code == 400, values
+        assert response.get_json() == {"error": "Invalid cursor"}
@@ -0,0 +1,45 @@
+from app import db
+from app.models import Profile, User
+from app.views import create_token
+
+
+def make_user(username):
+    user = User(username, "pw", username.title(), f"{username}@example.com", "")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_update_profile_accepts_numbers_sent_as_text(client):
+    user = make_user("owner")
+    profile = Profile(user.id, birth_year=1990, height=1.8)
+    db.session.add(profile)
+    db.session.commit()
+    headers = {"Authorization": f"Bearer {create_token(user.id)}"}
+
+    response = client.put(
+        f"/api/profiles/{profile.id}",
+        json={"birth_year": "1991", "height": "1.72"},
+        headers=headers,
+    )
+
+    assert response.status_code == 200
+    db.session.refresh(profile)
+    assert profile.birth_year == 1991
+    assert profile.height == 1.72
+
+
+def test_update_profile_rejects_non_numbers(client):
+    user = make_user("owner")
+    profile = Profile(user.id, birth_year=1990, height=1.8)
+    db.session.add(profile)
+    db.session.commit()
+    headers = {"Authorization": f"Bearer {create_token(user.id)}"}
+
+    response = client.put(
+        f"/api/profiles/{profile.id}", json={"birth_year": "soon"}, headers=headers
+    )
+
+    assert response.status_code == 400
+    db.session.refresh(profile)
+    assert profile.birth_year == 1990
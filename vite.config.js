@@ -1,11 +1,49 @@
 import { fileURLToPath, URL } from 'url'
+import { readdirSync, readFileSync, statSync, writeFileSync } from 'fs'
+import { join, resolve } from 'path'
+import { brotliCompressSync, gzipSync, constants } from 'zlib'
 
 import { defineConfig } from 'vite'
 import vue from '@vitejs/plugin-vue'
 
+// Write .br and .gz siblings next to every compressible file in the build
+// output, so Flask can serve them without compressing on each request.
+function precompress({ threshold = 1024 } = {}) {
+  const compressible = /\.(js|mjs|css|html|svg|json|txt)$/
+  let outDir
+
+  const walk = (dir) =>
+    readdirSync(dir).flatMap((name) => {
+      const path = join(dir, name)
+      return statSync(path).isDirectory() ? walk(path) : [path]
+    })
+
+  return {
+    name: 'precompress',
+    apply: 'build',
+    configResolved(config) {
+      outDir = resolve(config.root, config.build.outDir)
+    },
+    closeBundle() {
+      for (const file of walk(outDir)) {
+        if (!compressible.test(file)) continue
+        const data = readFileSync(file)
+        if (data.length < threshold) continue
+        writeFileSync(`${file}.gz`, gzipSync(data, { level: 9 }))
+        writeFileSync(
+          `${file}.br`,
+          brotliCompressSync(data, {
+            params: { [constants.BROTLI_PARAM_QUALITY]: constants.BROTLI_MAX_QUALITY }
+          })
+        )
+      }
+    }
+  }
+}
+
 //https://vitejs.dev/config/
 export default defineConfig({
-  plugins: [vue()],
+  plugins: [vue(), precompress()],
   resolve: {
     alias: {
       '@': fileURLToPath(new URL('./src', import.meta.url))
@@ -14,5 +52,6 @@ export default defineConfig({
   build:{
     outDir: 'app/static',
     emptyOutDir: true,
+    manifest: true,
   }
 })